@@ -1,10 +1,19 @@
-import time
+import asyncio
+import queue
+import threading
 from datetime import datetime
 from app.services.email_service import EmailService
 from app.services.calendar_service import CalendarService
 from app.services.ai_service import AIService
 from app.utils.heartbeat import Heartbeat
+from app.utils.processed_store import ProcessedStore
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.priority import PriorityScheduler, AsyncPriorityScheduler, score_email
 from app.utils.logger import get_logger
+from app.config.settings import (
+    PROCESSED_STORE_FILE, PROCESSED_STORE_MAX_ENTRIES,
+    OLLAMA_MAX_CONCURRENCY, OLLAMA_BATCH_SIZE, OLLAMA_WARMUP, PIPELINE_QUEUE_SIZE
+)
 
 logger = get_logger()
 
@@ -13,28 +22,56 @@ class EmailMonitorAgent:
     """
     Agente principal que monitora emails e calendário.
     Usa IA para classificar e sugerir respostas.
+    
+    Funciona como pipeline com filas limitadas:
+    busca (1 thread) → classificação (N workers) → saída (1 thread).
+    Fila cheia bloqueia a busca (back-pressure). A fila de classificação
+    é por prioridade: emails com cara de urgentes passam à frente dos de massa.
     """
     
+    SHUTDOWN_TIMEOUT = 5  # segundos de espera por cada thread ao parar
+    
     def __init__(self, email_service: EmailService, calendar_service: CalendarService, 
-                 ai_service: AIService, heartbeat: Heartbeat, check_interval: int = 30):
+                 ai_service: AIService, heartbeat: Heartbeat, check_interval: int = 30,
+                 processed_store: ProcessedStore = None):
         self.email_service = email_service
         self.calendar_service = calendar_service
         self.ai_service = ai_service
         self.heartbeat = heartbeat
         self.check_interval = check_interval
+        if processed_store is None:
+            processed_store = ProcessedStore(
+                PROCESSED_STORE_FILE,
+                max_entries=PROCESSED_STORE_MAX_ENTRIES
+            )
+        self.processed_store = processed_store
         self.running = False
         
+        # Pipeline
+        self.num_workers = max(1, OLLAMA_MAX_CONCURRENCY)
+        self.classify_queue = PriorityScheduler(maxsize=PIPELINE_QUEUE_SIZE)
+        self.output_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        self._workers_done = threading.Event()
+        self._threads = []
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        
         logger.info("EmailMonitorAgent inicializado")
     
-    def _process_email(self, email: dict):
+    def _report_email(self, email: dict, analysis: dict):
         """
-        Processa um único email.
+        Estágio de saída: exibe o resultado e registra o email como processado.
+        
+        Args:
+            email: Dados do email
+            analysis: Resultado de AIService.analyze_email
         """
         try:
-            email_id = email.get('id', 'unknown')
             subject = email.get('subject', 'Sem assunto')
-            sender = email.get('from', {}).get('emailAddress', {}).get('address', 'Desconhecido')
+            sender = ((email.get('from') or {}).get('emailAddress') or {}).get('address', 'Desconhecido')
             received = email.get('receivedDateTime', '')
+            urgency = analysis['urgency']
             
             logger.info(f"\n{'='*60}")
             logger.info(f"📧 NOVO EMAIL")
@@ -42,9 +79,6 @@ class EmailMonitorAgent:
             logger.info(f"Assunto: {subject}")
             logger.info(f"Recebido: {received}")
             
-            # Classificação de urgência com IA
-            urgency = self.ai_service.classify_urgency(email)
-            
             # Emoji visual baseado na urgência
             urgency_emoji = {
                 'ALTA': '🔴',
@@ -52,84 +86,323 @@ class EmailMonitorAgent:
                 'BAIXA': '🟢'
             }.get(urgency, '⚪')
             
-            logger.info(f"Urgência: {urgency_emoji} {urgency}")
+            if analysis.get('provisional'):
+                logger.info(f"Urgência: {urgency_emoji} {urgency} (provisória, Ollama indisponível; reclassifica quando voltar)")
+            else:
+                logger.info(f"Urgência: {urgency_emoji} {urgency}")
             
-            # Sugestão de resposta (simplificado por enquanto)
-            if urgency == "ALTA":
-                suggestion = self.ai_service.suggest_reply(email)
-                logger.info(f"\n💡 Sugestão de resposta:\n{suggestion}")
+            # Sugestão de resposta (só para ALTA)
+            if analysis['suggestion']:
+                logger.info(f"\n💡 Sugestão de resposta:\n{analysis['suggestion']}")
             
             logger.info(f"{'='*60}\n")
             
+            # Registra para não reclassificar no próximo ciclo
+            self.processed_store.mark_processed(email, urgency, provisional=analysis.get('provisional', False))
+            
         except Exception as e:
             logger.error(f"Erro ao processar email: {e}")
+        
+        finally:
+            self._release(email)
+    
+    def _release(self, email: dict):
+        """Remove o email do conjunto em processamento."""
+        with self._in_flight_lock:
+            self._in_flight.discard(ProcessedStore.make_key(email))
     
-    def _check_emails(self):
+    def _fetch_new_emails(self) -> list:
         """
-        Verifica e processa emails não lidos.
+        Sincroniza o espelho local (delta query) e retorna os emails não
+        lidos que ainda não foram classificados nem estão no pipeline,
+        já com os cabeçalhos de lista usados pelo pré-classificador.
         """
-        try:
-            emails = self.email_service.get_unread_emails()
-            
-            if not emails:
-                logger.debug("Nenhum email novo")
-                return
+        self.email_service.try_sync_mirror()
+        emails = self._select_new_emails(self.email_service.mirror.get_unread())
+        self.email_service.attach_list_headers(emails)
+        return emails
+    
+    def _select_new_emails(self, unread: list) -> list:
+        """
+        Escolhe, entre os não lidos da inbox no espelho, os ainda não
+        classificados e fora do pipeline. Marca os escolhidos como em processamento.
+        
+        A seleção olha o estado do espelho, não as mudanças da última
+        sincronização: o cursor de delta é compartilhado com menu, chat e
+        relatórios, então um email pode entrar no espelho por outra chamada.
+        
+        Emails com classificação provisória (heurística) voltam para a fila
+        assim que o disjuntor do Ollama deixa de estar aberto.
+        """
+        new_emails = []
+        retry_provisional = not self.ai_service.breaker.is_open()
+        
+        for email in unread:
+            if self.processed_store.is_processed(email, include_provisional=not retry_provisional):
+                continue
             
-            logger.info(f"📬 {len(emails)} email(s) não lido(s) encontrado(s)")
+            with self._in_flight_lock:
+                key = ProcessedStore.make_key(email)
+                if key in self._in_flight:
+                    continue
+                self._in_flight.add(key)
             
-            for email in emails:
-                self._process_email(email)
+            new_emails.append(email)
         
-        except Exception as e:
-            logger.error(f"Erro ao verificar emails: {e}")
+        # Mais recentes primeiro dentro de cada prioridade; urgentes entram
+        # na fila antes que ela encha com o backlog
+        new_emails.sort(key=lambda e: e.get('receivedDateTime', ''), reverse=True)
+        new_emails.sort(key=score_email)
+        
+        return new_emails
     
-    def _check_calendar(self):
+    def _put(self, target: queue.Queue, item) -> bool:
         """
-        Verifica eventos próximos do calendário.
+        Enfileira com back-pressure: espera enquanto a fila estiver cheia,
+        desistindo se o agente for parado.
         """
-        try:
-            events = self.calendar_service.get_events(days_ahead=1, limit=3)
+        while not self._stop_event.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        
+        return False
+    
+    def _fetch_stage(self):
+        """
+        Estágio de busca: verifica emails a cada ciclo e alimenta a fila
+        de classificação. Calendário e estatísticas no heartbeat.
+        """
+        while not self._stop_event.is_set():
+            try:
+                emails = self._fetch_new_emails()
+                
+                if emails:
+                    logger.info(f"📬 {len(emails)} email(s) não lido(s) novo(s) encontrado(s)")
+                else:
+                    logger.debug("Nenhum email novo")
+                
+                for email in emails:
+                    if not self._put(self.classify_queue, email):
+                        break
+            
+            except Exception as e:
+                logger.error(f"Erro ao verificar emails: {e}")
             
-            if not events:
-                logger.debug("Nenhum evento próximo")
-                return
+            # Verifica calendário (menos frequente, só no heartbeat)
+            try:
+                if self.heartbeat.check():
+                    self._check_calendar()
+                    self._log_http_stats()
+                    self._log_ai_stats()
+                    self._log_queue_stats(self.classify_queue)
+            except Exception as e:
+                # Uma falha aqui não pode matar a thread de busca
+                logger.error(f"Erro no heartbeat: {e}")
             
-            logger.info(f"\n📅 {len(events)} evento(s) nas próximas 24h:")
+            # Aguarda próximo ciclo (acorda na hora se o agente parar)
+            self._stop_event.wait(self.check_interval)
+    
+    def _classifier_worker(self):
+        """
+        Estágio de classificação: pega o próximo email e, se houver mais
+        esperando, até OLLAMA_BATCH_SIZE num único prompt.
+        """
+        while not self._stop_event.is_set():
+            try:
+                batch = [self.classify_queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
             
-            for event in events:
-                subject = event.get('subject', 'Sem título')
-                start = event.get('start', {}).get('dateTime', '')
-                location = event.get('location', {}).get('displayName', 'Sem local')
-                is_online = event.get('isOnlineMeeting', False)
-                
-                meeting_type = "💻 Online" if is_online else f"📍 {location}"
+            while len(batch) < OLLAMA_BATCH_SIZE:
+                try:
+                    batch.append(self.classify_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                urgencies = self.ai_service.classify_batch(batch) if len(batch) > 1 else {}
+            except Exception as e:
+                logger.error(f"Erro na classificação em lote: {e}")
+                urgencies = {}
+            
+            for email in batch:
+                try:
+                    analysis = self.ai_service.analyze_email(email, urgency=urgencies.get(email.get('id')))
+                except Exception as e:
+                    # Não marcado como processado: volta na seleção do próximo ciclo
+                    logger.error(f"Erro ao classificar email (nova tentativa no próximo ciclo): {e}")
+                    self._release(email)
+                    continue
                 
-                logger.info(f"  • {subject}")
-                logger.info(f"    Início: {start}")
-                logger.info(f"    Local: {meeting_type}")
+                self.output_queue.put((email, analysis))
+    
+    def _output_stage(self):
+        """
+        Estágio de saída: consome resultados até os workers terminarem.
+        """
+        while True:
+            try:
+                email, analysis = self.output_queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._workers_done.is_set():
+                    break
+                continue
+            
+            self._report_email(email, analysis)
+    
+    def _check_calendar(self):
+        """
+        Verifica eventos próximos do calendário.
+        """
+        try:
+            self._log_events(self.calendar_service.get_events(days_ahead=1, limit=3))
         
         except Exception as e:
             logger.error(f"Erro ao verificar calendário: {e}")
     
+    def _log_events(self, events: list):
+        """
+        Exibe os eventos próximos do calendário.
+        """
+        if not events:
+            logger.debug("Nenhum evento próximo")
+            return
+        
+        logger.info(f"\n📅 {len(events)} evento(s) nas próximas 24h:")
+        
+        for event in events:
+            subject = event.get('subject', 'Sem título')
+            start = event.get('start', {}).get('dateTime', '')
+            location = event.get('location', {}).get('displayName', 'Sem local')
+            is_online = event.get('isOnlineMeeting', False)
+            
+            meeting_type = "💻 Online" if is_online else f"📍 {location}"
+            
+            logger.info(f"  • {subject}")
+            logger.info(f"    Início: {start}")
+            logger.info(f"    Local: {meeting_type}")
+    
+    def _log_http_stats(self):
+        """
+        Registra estatísticas do pool HTTP compartilhado com o Graph.
+        """
+        try:
+            for host, stats in self.email_service.graph.pool_stats().items():
+                logger.info(
+                    f"🔌 {host}: {stats['requests']} req, {stats['connections']} conexões, "
+                    f"{stats['retries']} retries, {stats['errors']} erros, {stats['avg_ms']}ms médio"
+                )
+        except Exception as e:
+            logger.debug(f"Erro ao obter estatísticas HTTP: {e}")
+        
+        try:
+            for endpoint, stats in self.email_service.graph.rate_limiter.stats().items():
+                if stats['requests']:
+                    logger.info(
+                        f"🚦 Graph {endpoint}: {stats['requests']} req, {stats['rate']} req/s, "
+                        f"{stats['throttled']} throttling(s), {stats['waited_s']}s em espera"
+                    )
+        except Exception as e:
+            logger.debug(f"Erro ao obter estatísticas do limitador: {e}")
+    
+    def _log_ai_stats(self):
+        """
+        Registra estatísticas do cache de classificações e do pré-classificador.
+        """
+        stats = self.ai_service.cache.stats()
+        logger.info(
+            f"🧠 Cache LLM: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%}), {stats['entries']} entradas, {stats['evictions']} despejos"
+        )
+        
+        if self.ai_service.rules:
+            stats = self.ai_service.rules.stats()
+            logger.info(
+                f"📏 Regras: {stats['llm_calls_saved']}/{stats['checked']} emails "
+                f"decididos sem LLM ({stats['rate']:.0%})"
+            )
+        
+        for host, stats in self.ai_service.pool.stats().items():
+            logger.info(
+                f"🦙 Ollama {host}: {stats['warm']} chamadas warm ({stats['warm_ms']}ms médio), "
+                f"{stats['cold']} cold start ({stats['cold_ms']}ms médio), {stats['errors']} erros"
+            )
+        
+        for breaker in (self.ai_service.breaker, self.ai_service.embed_breaker):
+            stats = breaker.stats()
+            log = logger.warning if stats['state'] != CircuitBreaker.CLOSED else logger.info
+            log(
+                f"🔌 Disjuntor {breaker.name}: {stats['state']}, aberto {stats['times_opened']}x, "
+                f"{stats['rejected']} chamadas recusadas"
+            )
+        
+        if self.ai_service.knn is not None:
+            stats = self.ai_service.knn.stats()
+            logger.info(
+                f"🧭 k-NN: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%}), {stats['entries']} vetores"
+            )
+    
+    def _log_queue_stats(self, classify_queue):
+        """
+        Registra quantos emails de cada prioridade estouraram o prazo na fila.
+        """
+        misses = classify_queue.deadline_misses
+        if any(misses.values()):
+            summary = ", ".join(f"{name}: {count}" for name, count in misses.items())
+            logger.info(f"⏳ Prazos de fila estourados: {summary}")
+    
+    def _discard_pending(self, classify_queue):
+        """
+        Descarta o que ficou na fila de classificação ao parar. Esses emails
+        continuam não lidos e fora do ProcessedStore, então são selecionados
+        de novo na próxima execução.
+        """
+        pending = 0
+        
+        while True:
+            try:
+                self._release(classify_queue.get_nowait())
+                pending += 1
+            except (queue.Empty, asyncio.QueueEmpty):
+                break
+        
+        if pending:
+            logger.info(f"↩️  {pending} email(s) não classificado(s) ficam para a próxima execução")
+    
+    def _start_thread(self, target, name: str) -> threading.Thread:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+    
     def run(self):
         """
-        Loop principal do agente.
+        Loop principal do agente: inicia o pipeline e aguarda até Ctrl+C.
         """
         self.running = True
+        self._stop_event.clear()
+        self._workers_done.clear()
+        self._in_flight.clear()
+        self._threads = []
+        
         logger.info("🚀 Agente iniciado e monitorando...")
         logger.info(f"⏱️  Verificando a cada {self.check_interval} segundos")
+        logger.info(f"⚙️  Pipeline com {self.num_workers} worker(s) de classificação")
+        
+        self._fetcher = self._start_thread(self._fetch_stage, "fetcher")
+        self._workers = [
+            self._start_thread(self._classifier_worker, f"classifier-{i + 1}")
+            for i in range(self.num_workers)
+        ]
+        self._output = self._start_thread(self._output_stage, "output")
         
         try:
-            while self.running:
-                # Verifica emails
-                self._check_emails()
-                
-                # Verifica calendário (menos frequente, só no heartbeat)
-                if self.heartbeat.check():
-                    self._check_calendar()
-                
-                # Aguarda próximo ciclo
-                time.sleep(self.check_interval)
+            while not self._stop_event.wait(1):
+                pass
         
         except KeyboardInterrupt:
             logger.info("\n⚠️  Interrupção detectada. Finalizando agente...")
@@ -142,7 +415,199 @@ class EmailMonitorAgent:
     
     def stop(self):
         """
-        Para o agente gracefully.
+        Para o agente gracefully: encerra busca e workers, e deixa a saída
+        registrar o que já foi classificado.
         """
         self.running = False
+        self._stop_event.set()
+        
+        if self._threads:
+            self._fetcher.join(timeout=self.SHUTDOWN_TIMEOUT)
+            for worker in self._workers:
+                worker.join(timeout=self.SHUTDOWN_TIMEOUT)
+            
+            self._workers_done.set()
+            self._output.join(timeout=self.SHUTDOWN_TIMEOUT)
+            self._threads = []
+        
+        self._discard_pending(self.classify_queue)
+        
+        if self.ai_service.knn is not None:
+            self.ai_service.knn.save()
+        
         logger.info("🛑 Agente finalizado")
+
+
+class AsyncEmailMonitorAgent(EmailMonitorAgent):
+    """
+    Variante asyncio do agente: caixa de email, calendário, presença e
+    classificação rodam como tarefas concorrentes num único event loop,
+    sem uma thread por tarefa.
+    
+    Espera as variantes assíncronas dos serviços (AsyncEmailService,
+    AsyncCalendarService, AsyncUserService e AsyncAIService).
+    """
+    
+    def __init__(self, email_service, calendar_service, ai_service, heartbeat: Heartbeat,
+                 check_interval: int = 30, processed_store: ProcessedStore = None,
+                 user_service=None):
+        super().__init__(email_service, calendar_service, ai_service, heartbeat,
+                         check_interval, processed_store)
+        self.user_service = user_service
+    
+    async def _fetch_task(self, classify_queue: asyncio.Queue):
+        """
+        Busca: sincroniza o espelho e enfileira emails novos.
+        Fila cheia suspende a busca (back-pressure).
+        """
+        while self.running:
+            try:
+                try:
+                    await self.email_service.sync_mirror()
+                except Exception as e:
+                    logger.warning(f"Sincronização do espelho falhou, usando dados locais: {e}")
+                
+                unread = await asyncio.to_thread(self.email_service.mirror.get_unread)
+                emails = self._select_new_emails(unread)
+                await self.email_service.attach_list_headers(emails)
+                
+                if emails:
+                    logger.info(f"📬 {len(emails)} email(s) não lido(s) novo(s) encontrado(s)")
+                else:
+                    logger.debug("Nenhum email novo")
+                
+                for email in emails:
+                    await classify_queue.put(email)
+            
+            except Exception as e:
+                logger.error(f"Erro ao verificar emails: {e}")
+            
+            await asyncio.sleep(self.check_interval)
+    
+    async def _heartbeat_task(self):
+        """
+        Calendário e presença no heartbeat, em paralelo.
+        """
+        while self.running:
+            if self.heartbeat.check():
+                await asyncio.gather(self._check_calendar_async(), self._check_presence_async())
+                
+                try:
+                    self._log_ai_stats()
+                    self._log_queue_stats(self._async_classify_queue)
+                except Exception as e:
+                    logger.error(f"Erro ao registrar estatísticas: {e}")
+            
+            await asyncio.sleep(self.check_interval)
+    
+    async def _check_calendar_async(self):
+        if self.calendar_service is None:
+            return
+        
+        try:
+            self._log_events(await self.calendar_service.get_events(days_ahead=1, limit=3))
+        except Exception as e:
+            logger.error(f"Erro ao verificar calendário: {e}")
+    
+    async def _check_presence_async(self):
+        if self.user_service is None:
+            return
+        
+        try:
+            users = await self.user_service.get_all_users_with_presence()
+            
+            counts = {}
+            for user in users:
+                label = f"{user['emoji']} {user['status_description']}"
+                counts[label] = counts.get(label, 0) + 1
+            
+            summary = ", ".join(f"{label}: {count}" for label, count in sorted(counts.items()))
+            logger.info(f"👥 Presença ({len(users)} usuários): {summary}")
+        
+        except Exception as e:
+            logger.error(f"Erro ao verificar presença: {e}")
+    
+    async def _classifier_task(self, classify_queue: asyncio.Queue, output_queue: asyncio.Queue):
+        """
+        Classificação: mesmo agrupamento em lote dos workers síncronos.
+        """
+        while True:
+            batch = [await classify_queue.get()]
+            
+            while len(batch) < OLLAMA_BATCH_SIZE and not classify_queue.empty():
+                batch.append(classify_queue.get_nowait())
+            
+            try:
+                urgencies = await self.ai_service.classify_batch(batch) if len(batch) > 1 else {}
+            except Exception as e:
+                logger.error(f"Erro na classificação em lote: {e}")
+                urgencies = {}
+            
+            for email in batch:
+                try:
+                    analysis = await self.ai_service.analyze_email(email, urgency=urgencies.get(email.get('id')))
+                except Exception as e:
+                    # Não marcado como processado: volta na seleção do próximo ciclo
+                    logger.error(f"Erro ao classificar email (nova tentativa no próximo ciclo): {e}")
+                    self._release(email)
+                    continue
+                
+                await output_queue.put((email, analysis))
+    
+    async def _output_task(self, output_queue: asyncio.Queue):
+        """
+        Saída: o registro no ProcessedStore reescreve o arquivo (fsync),
+        então roda fora do event loop.
+        """
+        while True:
+            email, analysis = await output_queue.get()
+            await asyncio.to_thread(self._report_email, email, analysis)
+    
+    async def run(self):
+        """
+        Loop principal assíncrono. Ctrl+C (cancelamento) encerra as tarefas
+        e registra o que já foi classificado.
+        """
+        self.running = True
+        self._in_flight.clear()
+        
+        logger.info("🚀 Agente (asyncio) iniciado e monitorando...")
+        logger.info(f"⏱️  Verificando a cada {self.check_interval} segundos")
+        
+        classify_queue = AsyncPriorityScheduler(maxsize=PIPELINE_QUEUE_SIZE)
+        self._async_classify_queue = classify_queue
+        output_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        
+        tasks = [
+            asyncio.create_task(self._fetch_task(classify_queue)),
+            asyncio.create_task(self._heartbeat_task()),
+            asyncio.create_task(self._output_task(output_queue)),
+        ] + [
+            asyncio.create_task(self._classifier_task(classify_queue, output_queue))
+            for _ in range(self.num_workers)
+        ]
+        
+        if OLLAMA_WARMUP:
+            tasks.append(asyncio.create_task(self.ai_service.pool.warm_up(self.ai_service.model)))
+        
+        try:
+            await asyncio.gather(*tasks)
+        
+        except asyncio.CancelledError:
+            logger.info("\n⚠️  Interrupção detectada. Finalizando agente...")
+        
+        finally:
+            self.running = False
+            
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            
+            # Registra o que já saiu da classificação
+            while not output_queue.empty():
+                await asyncio.to_thread(self._report_email, *output_queue.get_nowait())
+            
+            self._discard_pending(classify_queue)
+            
+            # Salva o índice k-NN fora do event loop
+            await asyncio.to_thread(self.stop)
@@ -1,4 +1,4 @@
-from decouple import config
+from decouple import config, Csv
 
 # Microsoft Azure AD Configuration
 TENANT_ID = config('TENANT_ID')
@@ -11,15 +11,86 @@ SCOPES = [
     "Calendars.Read"
 ]
 
+# Cache de tokens do MSAL (evita device flow a cada inicialização)
+TOKEN_CACHE_FILE = config('TOKEN_CACHE_FILE', default='.token_cache')
+# Renova o access token em segundo plano este tempo antes de expirar
+TOKEN_REFRESH_MARGIN_SECONDS = config('TOKEN_REFRESH_MARGIN_SECONDS', default=300, cast=int)
+
 # Email Monitor Settings
 CHECK_INTERVAL_SECONDS = config('CHECK_INTERVAL_SECONDS', default=30, cast=int)
 HEARTBEAT_MINUTES = config('HEARTBEAT_MINUTES', default=20, cast=int)
 MAX_EMAILS_PER_CHECK = config('MAX_EMAILS_PER_CHECK', default=5, cast=int)
 
+# Registro de emails já processados (evita reclassificar a cada ciclo)
+PROCESSED_STORE_FILE = config('PROCESSED_STORE_FILE', default='.processed_emails.json')
+PROCESSED_STORE_MAX_ENTRIES = config('PROCESSED_STORE_MAX_ENTRIES', default=5000, cast=int)
+
+# Microsoft Graph (transporte HTTP compartilhado)
+GRAPH_TIMEOUT = config('GRAPH_TIMEOUT', default=10, cast=int)
+GRAPH_MAX_RETRIES = config('GRAPH_MAX_RETRIES', default=3, cast=int)
+GRAPH_RETRY_DELAY = config('GRAPH_RETRY_DELAY', default=2, cast=int)
+GRAPH_POOL_SIZE = config('GRAPH_POOL_SIZE', default=20, cast=int)
+GRAPH_PAGE_SIZE = config('GRAPH_PAGE_SIZE', default=100, cast=int)
+PRESENCE_MAX_WORKERS = config('PRESENCE_MAX_WORKERS', default=4, cast=int)
+# Orçamento de requisições por segundo por endpoint (compartilhado pelo processo)
+GRAPH_RATE_LIMITS = config('GRAPH_RATE_LIMITS', default='outlook:15,presence:5,users:10,default:10', cast=Csv())
+
+# Sincronização incremental (Graph delta query)
+DELTA_PAGE_SIZE = config('DELTA_PAGE_SIZE', default=50, cast=int)
+
+# Espelho local da caixa (SQLite)
+MAILBOX_DB_FILE = config('MAILBOX_DB_FILE', default='data/mailbox.db')
+# Também é a janela da primeira sincronização (delta) do espelho
+MAILBOX_RETENTION_DAYS = config('MAILBOX_RETENTION_DAYS', default=30, cast=int)
+
 # Ollama Configuration
 OLLAMA_MODEL = config('OLLAMA_MODEL', default='llama3.2:3b')
 OLLAMA_HOST = config('OLLAMA_HOST', default='http://localhost:11434')
 OLLAMA_TIMEOUT = config('OLLAMA_TIMEOUT', default=30, cast=int)
+OLLAMA_HOSTS = config('OLLAMA_HOSTS', default=OLLAMA_HOST, cast=Csv())
+OLLAMA_KEEP_ALIVE = config('OLLAMA_KEEP_ALIVE', default='30m')
+OLLAMA_WARMUP = config('OLLAMA_WARMUP', default=True, cast=bool)
+OLLAMA_BATCH_SIZE = config('OLLAMA_BATCH_SIZE', default=8, cast=int)
+OLLAMA_MAX_CONCURRENCY = config('OLLAMA_MAX_CONCURRENCY', default=2, cast=int)
+OLLAMA_BREAKER_FAILURES = config('OLLAMA_BREAKER_FAILURES', default=3, cast=int)
+OLLAMA_BREAKER_RESET_SECONDS = config('OLLAMA_BREAKER_RESET_SECONDS', default=30, cast=int)
+
+# Pipeline do agente (busca → classificação → saída)
+PIPELINE_QUEUE_SIZE = config('PIPELINE_QUEUE_SIZE', default=50, cast=int)
+
+# Prioridade na fila de classificação (metadados, antes do LLM)
+VIP_SENDERS = config('VIP_SENDERS', default='', cast=Csv(lambda s: s.strip().lower()))
+PRIORITY_KEYWORDS = config('PRIORITY_KEYWORDS', default='urgente,urgent,prazo,hoje,asap,imediato', cast=Csv(lambda s: s.strip().lower()))
+BULK_SENDER_PATTERNS = config('BULK_SENDER_PATTERNS', default='noreply,no-reply,newsletter,mailer-daemon,notifications', cast=Csv(lambda s: s.strip().lower()))
+PRIORITY_DEADLINE_ALTA = config('PRIORITY_DEADLINE_ALTA', default=30, cast=int)
+PRIORITY_DEADLINE_MEDIA = config('PRIORITY_DEADLINE_MEDIA', default=300, cast=int)
+PRIORITY_DEADLINE_BAIXA = config('PRIORITY_DEADLINE_BAIXA', default=1800, cast=int)
+
+# Chat
+CHAT_CONTEXT_TTL_SECONDS = config('CHAT_CONTEXT_TTL_SECONDS', default=60, cast=int)
+CHAT_RETRIEVAL_TOP_K = config('CHAT_RETRIEVAL_TOP_K', default=6, cast=int)
+CHAT_CONTEXT_TOKEN_BUDGET = config('CHAT_CONTEXT_TOKEN_BUDGET', default=500, cast=int)
+CHAT_RETRIEVAL_EMBEDDINGS = config('CHAT_RETRIEVAL_EMBEDDINGS', default=False, cast=bool)
+CHAT_MEMORY_TOKEN_BUDGET = config('CHAT_MEMORY_TOKEN_BUDGET', default=800, cast=int)
+CHAT_SUMMARY_TOKEN_BUDGET = config('CHAT_SUMMARY_TOKEN_BUDGET', default=200, cast=int)
+
+# Pré-classificação por regras (casos óbvios sem LLM)
+PRECLASSIFIER_ENABLED = config('PRECLASSIFIER_ENABLED', default=True, cast=bool)
+PRECLASSIFIER_RULES_FILE = config('PRECLASSIFIER_RULES_FILE', default='')
+
+# Classificador k-NN sobre embeddings (atalho antes do LLM)
+KNN_ENABLED = config('KNN_ENABLED', default=False, cast=bool)
+OLLAMA_EMBED_MODEL = config('OLLAMA_EMBED_MODEL', default='nomic-embed-text')
+KNN_INDEX_FILE = config('KNN_INDEX_FILE', default='data/knn_index.npz')
+KNN_K = config('KNN_K', default=5, cast=int)
+KNN_MIN_AGREEMENT = config('KNN_MIN_AGREEMENT', default=0.8, cast=float)
+KNN_MIN_SIMILARITY = config('KNN_MIN_SIMILARITY', default=0.85, cast=float)
+KNN_MAX_ENTRIES = config('KNN_MAX_ENTRIES', default=5000, cast=int)
+
+# Cache de respostas do LLM
+LLM_CACHE_FILE = config('LLM_CACHE_FILE', default='.llm_cache.json')
+LLM_CACHE_MAX_ENTRIES = config('LLM_CACHE_MAX_ENTRIES', default=2000, cast=int)
+LLM_CACHE_TTL_HOURS = config('LLM_CACHE_TTL_HOURS', default=24, cast=int)
 
 # Logging
 LOG_LEVEL = config('LOG_LEVEL', default='INFO')
@@ -0,0 +1,62 @@
+"""
+Avaliação offline do classificador k-NN.
+
+Classifica cada email do índice pelos vizinhos (leave-one-out) e compara
+com o rótulo dado pelo LLM, para vários limiares de similaridade.
+
+Uso: python -m app.evaluate_knn
+"""
+
+from app.config.settings import (
+    KNN_INDEX_FILE, KNN_K, KNN_MIN_AGREEMENT, KNN_MIN_SIMILARITY, KNN_MAX_ENTRIES
+)
+from app.utils.knn_index import EmbeddingIndex
+
+SIMILARITY_THRESHOLDS = [0.75, 0.80, 0.85, 0.90, 0.95]
+
+
+def main():
+    index = EmbeddingIndex(
+        KNN_INDEX_FILE,
+        k=KNN_K,
+        min_agreement=KNN_MIN_AGREEMENT,
+        min_similarity=KNN_MIN_SIMILARITY,
+        max_entries=KNN_MAX_ENTRIES
+    )
+    
+    print("\n" + "=" * 80)
+    print("🧭 AVALIAÇÃO DO CLASSIFICADOR k-NN")
+    print("=" * 80)
+    print(f"\nÍndice: {KNN_INDEX_FILE} ({len(index)} emails rotulados)")
+    print(f"k = {KNN_K}, concordância mínima = {KNN_MIN_AGREEMENT:.0%}\n")
+    
+    if len(index) <= KNN_K:
+        print("⚠️  Poucos emails no índice. Rode o monitoramento com KNN_ENABLED=True primeiro.\n")
+        return 1
+    
+    print(f"{'Similaridade':>12} | {'Cobertura':>10} | {'Concordância c/ LLM':>20}")
+    print("-" * 50)
+    
+    for threshold in sorted(set(SIMILARITY_THRESHOLDS + [KNN_MIN_SIMILARITY])):
+        index.min_similarity = threshold
+        result = index.evaluate()
+        marker = "  ← atual" if threshold == KNN_MIN_SIMILARITY else ""
+        print(
+            f"{threshold:>12.2f} | {result['coverage']:>10.1%} | "
+            f"{result['agreement']:>20.1%}{marker}"
+        )
+    
+    index.min_similarity = KNN_MIN_SIMILARITY
+    result = index.evaluate()
+    
+    if result['confusion']:
+        print("\nConfusão no limiar atual (LLM → k-NN):")
+        for (expected, predicted), count in sorted(result['confusion'].items()):
+            print(f"  {expected:>5} → {predicted:<5} {count}")
+    
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,19 +1,25 @@
+import sys
+import asyncio
 from app.config.settings import *
-from app.services.auth_service import AuthService
-from app.services.email_service import EmailService
-from app.services.calendar_service import CalendarService
-from app.services.ai_service import AIService
+from app.services.auth_service import AuthService, TokenProvider
+from app.services.graph_client import GraphClient
+from app.services.async_graph_client import AsyncGraphClient
+from app.services.email_service import EmailService, AsyncEmailService
+from app.services.calendar_service import CalendarService, AsyncCalendarService
+from app.services.user_service import AsyncUserService
+from app.services.ai_service import AIService, AsyncAIService
 from app.utils.heartbeat import Heartbeat
-from app.agent import EmailMonitorAgent
+from app.agent import EmailMonitorAgent, AsyncEmailMonitorAgent
 
 
 def main():
     try:
         auth = AuthService(TENANT_ID, CLIENT_ID, SCOPES)
-        token = auth.get_token()
+        token_provider = TokenProvider(auth).start()
 
-        email_service = EmailService(token)
-        calendar_service = CalendarService(token)
+        graph = GraphClient(token_provider)
+        email_service = EmailService(graph)
+        calendar_service = CalendarService(graph)
         ai_service = AIService()
         heartbeat = Heartbeat(HEARTBEAT_MINUTES)
 
@@ -32,5 +38,35 @@ def main():
         print(f"\n❌ Erro fatal na inicialização do agente: {e}")
 
 
+async def main_async():
+    """
+    Agente em modo asyncio (python -m app.main --async).
+    """
+    auth = AuthService(TENANT_ID, CLIENT_ID, SCOPES)
+    token_provider = TokenProvider(auth).start()
+    
+    graph = AsyncGraphClient(token_provider)
+    
+    agent = AsyncEmailMonitorAgent(
+        AsyncEmailService(graph),
+        AsyncCalendarService(graph),
+        AsyncAIService(),
+        Heartbeat(HEARTBEAT_MINUTES),
+        check_interval=CHECK_INTERVAL_SECONDS,
+        user_service=AsyncUserService(graph)
+    )
+    
+    try:
+        await agent.run()
+    finally:
+        await graph.aclose()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--async" in sys.argv:
+        try:
+            asyncio.run(main_async())
+        except KeyboardInterrupt:
+            print("\n🛑 Execução interrompida pelo usuário. Finalizando agente...")
+    else:
+        main()
\ No newline at end of file
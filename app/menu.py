@@ -82,7 +82,7 @@ class MenuSystem:
         print("\n🔄 Buscando status dos usuários...")
         print("⏳ (Isso pode demorar alguns segundos...)")
         
-        users = self.user_service.get_all_users_with_presence(max_users=50)
+        users = self.user_service.get_all_users_with_presence()
         
         print("\n" + "=" * 80)
         print("👥 STATUS DE USUÁRIOS DA ORGANIZAÇÃO")
@@ -190,14 +190,18 @@ class MenuSystem:
                     print(f"\n🤖 Agente: {response}")
                     continue
                 
-                # Processa pergunta com IA
-                print("\n🤖 Agente: ", end="", flush=True)
-                print("⏳ Pensando...", end="\r", flush=True)
+                # Processa pergunta com IA (resposta exibida enquanto é gerada)
+                print("\n🤖 Agente: ⏳ Pensando...", end="", flush=True)
                 
-                response = self.chat_service.chat(user_input)
+                first = True
+                for part in self.chat_service.chat_stream(user_input):
+                    if first:
+                        print("\r🤖 Agente: " + " " * 15 + "\r🤖 Agente: ", end="", flush=True)
+                        part = part.lstrip()
+                        first = False
+                    print(part, end="", flush=True)
                 
-                print("🤖 Agente: " + " " * 20)  # Limpa "Pensando..."
-                print(f"🤖 Agente: {response}")
+                print()
             
             except KeyboardInterrupt:
                 print("\n\n⚠️  Chat interrompido.")
@@ -0,0 +1,265 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class MailboxMirror:
+    """
+    Espelho local da caixa de email em SQLite.
+    
+    Mantido em dia pelas mudanças da delta query (EmailService.sync_mirror),
+    permite que relatórios e chat rodem como consultas locais indexadas,
+    inclusive offline.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            id TEXT PRIMARY KEY,
+            folder TEXT NOT NULL,
+            subject TEXT,
+            sender TEXT,
+            received_at TEXT,
+            last_modified TEXT,
+            importance TEXT,
+            is_read INTEGER,
+            has_attachments INTEGER,
+            conversation_id TEXT,
+            raw TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_received ON messages (received_at);
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id);
+        CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages (sender);
+        CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages (is_read, received_at);
+        CREATE TABLE IF NOT EXISTS sync_state (
+            folder TEXT PRIMARY KEY,
+            state TEXT NOT NULL
+        );
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        
+        if Path(path).parent:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+        
+        logger.info(f"MailboxMirror inicializado ({self.count()} emails em {path})")
+    
+    @staticmethod
+    def _sender_of(message: dict) -> str:
+        address = ((message.get('from') or {}).get('emailAddress') or {}).get('address')
+        return (address or '').lower()
+    
+    def _upsert(self, folder: str, message: dict):
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO messages
+                (id, folder, subject, sender, received_at, last_modified, importance,
+                 is_read, has_attachments, conversation_id, raw)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                message.get('id'),
+                folder,
+                message.get('subject', ''),
+                self._sender_of(message),
+                message.get('receivedDateTime', ''),
+                message.get('lastModifiedDateTime', ''),
+                message.get('importance', 'normal'),
+                int(bool(message.get('isRead', False))),
+                int(bool(message.get('hasAttachments', False))),
+                message.get('conversationId'),
+                json.dumps(message, ensure_ascii=False)
+            )
+        )
+    
+    def get_sync_state(self, folder: str) -> dict:
+        """Retorna o estado da delta query (deltaLink) de uma pasta."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT state FROM sync_state WHERE folder = ?", (folder,)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+    
+    def is_synced(self, folder: str) -> bool:
+        """True se a pasta já completou ao menos uma rodada de delta."""
+        return 'delta_link' in self.get_sync_state(folder)
+    
+    def apply_changes(self, folder: str, changes, state: dict) -> list:
+        """
+        Aplica um fluxo de mudanças (EmailService.get_changes) numa única
+        transação, gravando o estado da sincronização junto.
+        Se algo falhar no meio, nada é gravado e a próxima sincronização
+        repete a rodada.
+        
+        Args:
+            folder: Pasta sincronizada
+            changes: Iterável de mudanças {'type', 'id', 'message'}
+            state: Estado da delta query (atualizado pelo gerador)
+        
+        Returns:
+            Lista de mudanças aplicadas
+        """
+        applied = []
+        
+        with self._lock:
+            try:
+                for change in changes:
+                    if change['type'] == 'reset':
+                        self.conn.execute("DELETE FROM messages WHERE folder = ?", (folder,))
+                    elif change['type'] == 'removed':
+                        self.conn.execute(
+                            "DELETE FROM messages WHERE id = ? AND folder = ?",
+                            (change['id'], folder)
+                        )
+                    else:
+                        self._upsert(folder, change['message'])
+                    
+                    applied.append(change)
+                
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (folder, state) VALUES (?, ?)",
+                    (folder, json.dumps(state))
+                )
+                self.conn.commit()
+            
+            except Exception:
+                self.conn.rollback()
+                raise
+        
+        return applied
+    
+    def prune(self, older_than: str) -> int:
+        """
+        Remove emails recebidos antes de 'older_than' (ISO 8601).
+        
+        Returns:
+            Número de emails removidos
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM messages WHERE received_at < ?", (older_than,)
+            )
+            self.conn.commit()
+        return cursor.rowcount
+    
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    
+    def get_messages_since(self, since: str, folder: str = "inbox", limit: int = None) -> list:
+        """
+        Emails recebidos desde 'since' (ISO 8601), mais recentes primeiro.
+        """
+        query = (
+            "SELECT raw FROM messages WHERE folder = ? AND received_at >= ? "
+            "ORDER BY received_at DESC"
+        )
+        params = [folder, since]
+        
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        
+        return [json.loads(row[0]) for row in rows]
+    
+    def get_stats(self, since: str, folder: str = "inbox") -> dict:
+        """
+        Estatísticas do período: total, não lidos, com anexos e importantes.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                """
+                SELECT
+                    COUNT(*),
+                    COALESCE(SUM(is_read = 0), 0),
+                    COALESCE(SUM(has_attachments), 0),
+                    COALESCE(SUM(importance = 'high'), 0)
+                FROM messages
+                WHERE folder = ? AND received_at >= ?
+                """,
+                (folder, since)
+            ).fetchone()
+        
+        return {
+            'total': row[0],
+            'unread': row[1],
+            'with_attachments': row[2],
+            'high_importance': row[3]
+        }
+    
+    def count_unread(self, folder: str = "inbox") -> int:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE folder = ? AND is_read = 0", (folder,)
+            ).fetchone()[0]
+    
+    def get_unread(self, folder: str = "inbox") -> list:
+        """
+        Todos os emails não lidos da pasta, mais recentes primeiro.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT raw FROM messages WHERE folder = ? AND is_read = 0 ORDER BY received_at DESC",
+                (folder,)
+            ).fetchall()
+        
+        return [json.loads(row[0]) for row in rows]
+    
+    def top_senders(self, since: str, limit: int = 5, folder: str = "inbox") -> list:
+        """
+        Remetentes mais frequentes do período.
+        
+        Returns:
+            [(remetente, quantidade), ...]
+        """
+        with self._lock:
+            return self.conn.execute(
+                """
+                SELECT sender, COUNT(*) AS total
+                FROM messages
+                WHERE folder = ? AND received_at >= ?
+                GROUP BY sender
+                ORDER BY total DESC
+                LIMIT ?
+                """,
+                (folder, since, limit)
+            ).fetchall()
+    
+    def get_unanswered(self, since: str) -> list:
+        """
+        Emails recebidos desde 'since' cuja conversa não tem nenhuma
+        mensagem de outro remetente (ou seja, ninguém respondeu).
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                """
+                SELECT m.raw FROM messages m
+                WHERE m.folder = 'inbox' AND m.received_at >= ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM messages r
+                      WHERE r.conversation_id = m.conversation_id
+                        AND r.sender != m.sender
+                  )
+                ORDER BY m.received_at DESC
+                """,
+                (since,)
+            ).fetchall()
+        
+        return [json.loads(row[0]) for row in rows]
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
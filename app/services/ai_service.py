@@ -1,28 +1,329 @@
-import ollama
-from app.config.settings import OLLAMA_MODEL, OLLAMA_HOST, OLLAMA_TIMEOUT
+import asyncio
+import json
+import time
+from app.config.settings import (
+    OLLAMA_MODEL, OLLAMA_HOST, OLLAMA_TIMEOUT, OLLAMA_BATCH_SIZE, OLLAMA_WARMUP,
+    LLM_CACHE_FILE, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_HOURS,
+    PRECLASSIFIER_ENABLED, PRECLASSIFIER_RULES_FILE,
+    KNN_ENABLED, OLLAMA_EMBED_MODEL, KNN_INDEX_FILE, KNN_K,
+    KNN_MIN_AGREEMENT, KNN_MIN_SIMILARITY, KNN_MAX_ENTRIES,
+    OLLAMA_BREAKER_FAILURES, OLLAMA_BREAKER_RESET_SECONDS
+)
+from app.services.ollama_pool import OllamaPool, AsyncOllamaPool
+from app.utils.llm_cache import LLMCache
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.priority import score_email, PRIORITY_NAMES
+from app.utils.knn_index import EmbeddingIndex
+from app.utils.rule_classifier import RuleClassifier
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
 
-class AIService:
+def _default_rules():
+    """Pré-classificador configurado pelo .env (None se desativado)."""
+    if not PRECLASSIFIER_ENABLED:
+        return None
+    return RuleClassifier(rules_file=PRECLASSIFIER_RULES_FILE or None)
+
+
+def _default_knn():
+    """Índice k-NN configurado pelo .env (None se desativado)."""
+    if not KNN_ENABLED:
+        return None
+    return EmbeddingIndex(
+        KNN_INDEX_FILE,
+        k=KNN_K,
+        min_agreement=KNN_MIN_AGREEMENT,
+        min_similarity=KNN_MIN_SIMILARITY,
+        max_entries=KNN_MAX_ENTRIES
+    )
+
+
+def _default_breaker(name: str = "Ollama"):
+    return CircuitBreaker(
+        name,
+        failure_threshold=OLLAMA_BREAKER_FAILURES,
+        reset_timeout=OLLAMA_BREAKER_RESET_SECONDS
+    )
+
+
+class ProvisionalUrgency(str):
+    """
+    Urgência que não veio do modelo (heurística com o Ollama fora do ar).
+    Compara igual a 'ALTA'/'MÉDIA'/'BAIXA', mas o agente não a trata como
+    definitiva: o email é reclassificado quando o disjuntor fechar.
+    """
+
+
+class _AIServiceBase:
+    """
+    Prompts, parsing das respostas, regras e heurísticas comuns ao
+    AIService e ao AsyncAIService (nada aqui chama o Ollama).
+    """
+    
+    URGENCY_LEVELS = ['ALTA', 'MÉDIA', 'BAIXA']
+    
+    @staticmethod
+    def _fallback_urgency(email: dict) -> str:
+        """
+        Urgência sem o modelo (Ollama fora do ar): heurística de metadados
+        da fila de prioridade (importância, VIP, palavras-chave). Provisória.
+        """
+        return ProvisionalUrgency(PRIORITY_NAMES[score_email(email)])
+    
+    def _pre_classify(self, email: dict) -> str:
+        """Urgência pelas regras, ou None se o email precisa do modelo."""
+        if not self.rules:
+            return None
+        
+        try:
+            return self.rules.classify(email)
+        except Exception as e:
+            logger.error(f"Erro nas regras de pré-classificação, seguindo para o modelo: {e}")
+            return None
+    
+    @staticmethod
+    def _embedding_text(email: dict) -> str:
+        """Texto usado no embedding: remetente, assunto e prévia."""
+        sender = ((email.get('from') or {}).get('emailAddress') or {}).get('address') or ''
+        subject = email.get('subject', '')[:200]
+        body_preview = " ".join(email.get('bodyPreview', '')[:300].split())
+        return f"De: {sender}\nAssunto: {subject}\n{body_preview}"
+    
+    def _knn_learn(self, email: dict, vector, urgency: str):
+        """Guarda o rótulo do LLM no índice para os próximos emails parecidos."""
+        if self.knn is not None and vector is not None:
+            self.knn.add(email.get('id'), vector, urgency, source='llm')
+    
+    @staticmethod
+    def _build_urgency_prompt(email: dict) -> str:
+        """
+        Monta o prompt de classificação de um email.
+        """
+        # Limita o contexto para não sobrecarregar o modelo
+        subject = email.get('subject', '')[:200]
+        sender = ((email.get('from') or {}).get('emailAddress') or {}).get('address') or 'desconhecido'
+        body_preview = email.get('bodyPreview', '')[:300]
+        
+        return f"""Analise este email e classifique sua urgência em ALTA, MÉDIA ou BAIXA.
+
+ALTA: Requer ação imediata, prazos curtos, problemas críticos
+MÉDIA: Importante mas pode aguardar algumas horas
+BAIXA: Informativo, sem pressa
+
+Email:
+De: {sender}
+Assunto: {subject}
+Prévia: {body_preview}
+
+Responda APENAS com uma palavra: ALTA, MÉDIA ou BAIXA."""
+    
+    @staticmethod
+    def _build_batch_prompt(emails: list) -> str:
+        """
+        Monta um prompt único com resumos compactos de vários emails.
+        """
+        summaries = []
+        for idx, email in enumerate(emails, 1):
+            subject = email.get('subject', '')[:120]
+            sender = ((email.get('from') or {}).get('emailAddress') or {}).get('address') or 'desconhecido'
+            body_preview = " ".join(email.get('bodyPreview', '')[:160].split())
+            summaries.append(f"[{idx}] De: {sender} | Assunto: {subject} | Prévia: {body_preview}")
+        
+        return f"""Classifique a urgência de cada email abaixo em ALTA, MÉDIA ou BAIXA.
+
+ALTA: Requer ação imediata, prazos curtos, problemas críticos
+MÉDIA: Importante mas pode aguardar algumas horas
+BAIXA: Informativo, sem pressa
+
+Emails:
+{chr(10).join(summaries)}
+
+Responda APENAS em JSON no formato:
+{{"classificacoes": [{{"id": 1, "urgency": "ALTA"}}, ...]}}"""
+    
+    def _parse_batch_response(self, result: str, count: int) -> dict:
+        """
+        Interpreta a resposta JSON da classificação em lote.
+        
+        Returns:
+            {índice: urgência} só com as respostas válidas
+        """
+        if not result:
+            return {}
+        
+        try:
+            parsed = json.loads(result)
+        except ValueError:
+            logger.warning(f"JSON inválido na classificação em lote: {result[:100]}")
+            return {}
+        
+        items = parsed.get('classificacoes', []) if isinstance(parsed, dict) else parsed
+        
+        urgencies = {}
+        for item in items if isinstance(items, list) else []:
+            try:
+                idx = int(item.get('id'))
+                urgency = str(item.get('urgency', '')).upper().strip()
+            except (AttributeError, TypeError, ValueError):
+                continue
+            
+            if 1 <= idx <= count and urgency in self.URGENCY_LEVELS:
+                urgencies[idx] = urgency
+        
+        return urgencies
+    
+    def _split_decided(self, emails: list) -> tuple:
+        """
+        Primeira etapa da classificação: regras, depois o cache (mesma
+        chave da classificação individual).
+        
+        Returns:
+            ({email_id: urgência} já decididos, [emails que seguem para k-NN/modelo])
+        """
+        results = {}
+        pending = []
+        
+        for email in emails:
+            urgency = self._pre_classify(email)
+            if urgency:
+                results[email.get('id')] = urgency
+                continue
+            
+            cached = self.cache.get(self.model, self._build_urgency_prompt(email))
+            if cached:
+                results[email.get('id')] = cached
+            else:
+                pending.append(email)
+        
+        return results, pending
+    
+    def _learn(self, email: dict, vector, urgency: str, prompt: str = None):
+        """Guarda a decisão do modelo no cache e no k-NN (grava em disco)."""
+        self.cache.set(self.model, prompt or self._build_urgency_prompt(email), urgency)
+        self._knn_learn(email, vector, urgency)
+    
+    def _accept_answer(self, email: dict, prompt: str, vector, result: str) -> str:
+        """
+        Interpreta a resposta do modelo para um email: urgência válida é
+        aprendida; sem resposta usa a heurística (provisória); resposta
+        fora do esperado vira MÉDIA.
+        """
+        if result is None:
+            urgency = self._fallback_urgency(email)
+            log = logger.debug if self.breaker.state == CircuitBreaker.OPEN else logger.warning
+            log(f"Ollama não retornou resposta. Usando heurística: {urgency}.")
+            return urgency
+        
+        urgency = result.upper().strip()
+        
+        if urgency in self.URGENCY_LEVELS:
+            logger.info(f"Email classificado como: {urgency}")
+            self._learn(email, vector, urgency, prompt)
+            return urgency
+        
+        logger.warning(f"Resposta inesperada do modelo: {result}. Usando MÉDIA como padrão.")
+        return "MÉDIA"
+    
+    def _accept_batch_answers(self, chunk: list, urgencies: dict, vectors: dict) -> tuple:
+        """
+        Aprende as respostas válidas de um prompt em lote.
+        
+        Returns:
+            ({email_id: urgência} respondidos no lote, [emails sem resposta válida])
+        """
+        results = {}
+        missing = []
+        
+        for idx, email in enumerate(chunk, 1):
+            urgency = urgencies.get(idx)
+            
+            if urgency:
+                self._learn(email, vectors.get(email.get('id')), urgency)
+                results[email.get('id')] = urgency
+            else:
+                missing.append(email)
+        
+        logger.info(f"Lote classificado: {len(results)}/{len(chunk)} no prompt único")
+        return results, missing
+    
+    @staticmethod
+    def _reply_template(urgency: str) -> str:
+        """Texto da sugestão de resposta conforme a urgência."""
+        if urgency == "ALTA":
+            return (
+                "Olá,\n\n"
+                "Recebi seu email e vou priorizar esta demanda.\n"
+                "Retorno com mais detalhes em breve.\n\n"
+                "Atenciosamente"
+            )
+        else:
+            return (
+                "Olá,\n\n"
+                "Obrigado pelo contato. Vou analisar e retorno em breve.\n\n"
+                "Atenciosamente"
+            )
+
+
+class AIService(_AIServiceBase):
     """
     Serviço de IA usando Ollama com Llama 3.2 3B.
     Focado em classificação e análise simples de emails.
     """
     
-    def __init__(self):
+    def __init__(self, cache: LLMCache = None, rules: RuleClassifier = None,
+                 knn: EmbeddingIndex = None, breaker: CircuitBreaker = None,
+                 pool: OllamaPool = None, embed_breaker: CircuitBreaker = None):
         self.model = OLLAMA_MODEL
         self.host = OLLAMA_HOST
         self.timeout = OLLAMA_TIMEOUT
+        
+        # Clientes persistentes (host/timeout/keep_alive configurados)
+        self.pool = pool or OllamaPool(timeout=self.timeout)
+        
+        # Cache de classificações (evita reenviar o mesmo prompt ao modelo)
+        self.cache = cache or LLMCache(
+            LLM_CACHE_FILE,
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            ttl_seconds=LLM_CACHE_TTL_HOURS * 3600
+        )
+        
+        # Regras determinísticas para os casos óbvios (sem LLM)
+        self.rules = rules or _default_rules()
+        
+        # k-NN sobre embeddings de emails já classificados pelo LLM
+        self.knn = knn if knn is not None else _default_knn()
+        
+        # Falha rápida enquanto o Ollama estiver fora do ar. Os embeddings usam
+        # outro modelo (OLLAMA_EMBED_MODEL): se ele faltar, só o k-NN desliga
+        self.breaker = breaker or _default_breaker()
+        self.embed_breaker = embed_breaker or _default_breaker("Ollama embeddings")
+        
         logger.info(f"AI Service inicializado com modelo: {self.model}")
+        
+        # Carrega o modelo antes do primeiro email (sem bloquear a inicialização)
+        if OLLAMA_WARMUP:
+            self.pool.warm_up_in_background(self.model)
     
-    def _call_ollama(self, prompt: str) -> str:
+    def _call_ollama(self, prompt: str, num_predict: int = 150, format: str = '') -> str:
         """
         Chama o Ollama de forma segura com tratamento de erros.
+        
+        Args:
+            prompt: Prompt do usuário
+            num_predict: Limite de tokens da resposta
+            format: 'json' para forçar saída JSON estruturada
+        
+        Returns:
+            Resposta do modelo, ou None se falhar ou o disjuntor estiver aberto
         """
+        if not self.breaker.allow():
+            logger.debug("Ollama indisponível (disjuntor aberto). Pulando chamada.")
+            return None
+        
         try:
-            response = ollama.chat(
+            response = self.pool.chat(
                 model=self.model,
                 messages=[
                     {
@@ -30,14 +331,17 @@ class AIService:
                         'content': prompt
                     }
                 ],
+                format=format,
                 options={
                     'temperature': 0.3,  # Mais determinístico
-                    'num_predict': 150,  # Limita resposta
+                    'num_predict': num_predict,  # Limita resposta
                 }
             )
+            self.breaker.record_success()
             return response['message']['content'].strip()
         
         except Exception as e:
+            self.breaker.record_failure()
             logger.error(f"Erro ao chamar Ollama: {e}")
             return None
     
@@ -51,8 +355,11 @@ class AIService:
         Returns:
             Resposta da IA
         """
+        if not self.breaker.allow():
+            return "Desculpe, o modelo de IA está indisponível no momento. Tente novamente em instantes."
+        
         try:
-            response = ollama.chat(
+            response = self.pool.chat(
                 model=self.model,
                 messages=messages,
                 options={
@@ -60,12 +367,154 @@ class AIService:
                     'num_predict': 300,  # Permite respostas maiores
                 }
             )
+            self.breaker.record_success()
             return response['message']['content'].strip()
         
         except Exception as e:
+            self.breaker.record_failure()
             logger.error(f"Erro ao chamar Ollama chat: {e}")
             return "Desculpe, tive um problema ao processar sua mensagem."
     
+    def _call_ollama_chat_stream(self, messages: list):
+        """
+        Como _call_ollama_chat, mas entrega a resposta em pedaços à medida
+        que o modelo gera (o primeiro chega em centenas de ms).
+        
+        Args:
+            messages: Lista de mensagens [{'role': 'user/assistant', 'content': '...'}]
+        
+        Yields:
+            Trechos de texto da resposta
+        """
+        if not self.breaker.allow():
+            yield "Desculpe, o modelo de IA está indisponível no momento. Tente novamente em instantes."
+            return
+        
+        start = time.perf_counter()
+        received = False
+        settled = False
+        
+        try:
+            for chunk in self.pool.chat_stream(
+                model=self.model,
+                messages=messages,
+                options={
+                    'temperature': 0.7,
+                    'num_predict': 300,
+                }
+            ):
+                content = chunk['message']['content']
+                if not content:
+                    continue
+                
+                if not received:
+                    received = True
+                    logger.debug(f"Primeiro token do chat em {(time.perf_counter() - start) * 1000:.0f}ms")
+                
+                yield content
+            
+            settled = True
+            self.breaker.record_success()
+        
+        except Exception as e:
+            settled = True
+            self.breaker.record_failure()
+            logger.error(f"Erro ao chamar Ollama chat (streaming): {e}")
+            if not received:
+                yield "Desculpe, tive um problema ao processar sua mensagem."
+        
+        finally:
+            # Consumidor abandonou o gerador (Ctrl+C, GeneratorExit): o disjuntor
+            # não pode ficar preso esperando o resultado do teste
+            if not settled:
+                if received:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.release()
+    
+    def summarize_conversation(self, summary: str, messages: list, max_words: int = 120) -> str:
+        """
+        Incorpora mensagens antigas do chat ao resumo da conversa.
+        
+        Args:
+            summary: Resumo atual (pode ser vazio)
+            messages: Mensagens [{'role': 'user/assistant', 'content': '...'}] a incorporar
+            max_words: Tamanho máximo do novo resumo
+        
+        Returns:
+            Novo resumo, ou None se o modelo falhar
+        """
+        transcript = "\n".join(
+            f"{'Usuário' if m['role'] == 'user' else 'Assistente'}: {m['content']}" for m in messages
+        )
+        
+        prompt = f"""Atualize o resumo de uma conversa entre o usuário e um assistente de emails.
+Mantenha fatos, nomes, datas e pedidos pendentes; descarte cumprimentos e repetições.
+Responda apenas com o novo resumo, em no máximo {max_words} palavras.
+
+RESUMO ATUAL:
+{summary or '(vazio)'}
+
+NOVAS MENSAGENS:
+{transcript}"""
+        
+        return self._call_ollama(prompt, num_predict=max_words * 2)
+    
+    def _embed(self, emails: list) -> list:
+        """
+        Embeddings dos emails numa única chamada ao Ollama.
+        
+        Returns:
+            Lista de vetores (mesma ordem dos emails) ou None em caso de erro
+        """
+        return self.embed_texts([self._embedding_text(email) for email in emails])
+    
+    def embed_texts(self, texts: list) -> list:
+        """
+        Embeddings de textos livres (OLLAMA_EMBED_MODEL) numa única chamada.
+        
+        Returns:
+            Lista de vetores (mesma ordem dos textos) ou None em caso de erro
+        """
+        if not self.embed_breaker.allow():
+            return None
+        
+        try:
+            response = self.pool.embed(model=OLLAMA_EMBED_MODEL, input=texts)
+            self.embed_breaker.record_success()
+            return response['embeddings']
+        
+        except Exception as e:
+            self.embed_breaker.record_failure()
+            logger.error(f"Erro ao gerar embeddings: {e}")
+            return None
+    
+    def _knn_lookup(self, emails: list) -> tuple:
+        """
+        Tenta classificar os emails pelo k-NN.
+        
+        Returns:
+            ({email_id: urgência} dos decididos, {email_id: vetor} de todos)
+        """
+        if self.knn is None or not emails:
+            return {}, {}
+        
+        vectors = self._embed(emails)
+        if not vectors:
+            return {}, {}
+        
+        found = {}
+        by_id = {}
+        
+        for email, vector in zip(emails, vectors):
+            by_id[email.get('id')] = vector
+            urgency = self.knn.predict(vector)
+            if urgency:
+                logger.debug(f"Classificação k-NN: {urgency} ({email.get('subject', '')[:50]})")
+                found[email.get('id')] = urgency
+        
+        return found, by_id
+    
     def classify_urgency(self, email: dict) -> str:
         """
         Classifica a urgência do email em: ALTA, MÉDIA, BAIXA.
@@ -76,65 +525,259 @@ class AIService:
         Returns:
             String com classificação: "ALTA", "MÉDIA" ou "BAIXA"
         """
+        urgency = self._pre_classify(email)
+        if urgency:
+            return urgency
+        
+        return self._classify_with_model(email)
+    
+    def _classify_with_model(self, email: dict, vector=None) -> str:
+        """
+        Classificação pelo LLM (com cache e k-NN), sem passar pelas regras.
+        
+        Args:
+            email: Dicionário com dados do email
+            vector: Embedding já calculado (o k-NN já foi consultado)
+        """
         try:
-            # Limita o contexto para não sobrecarregar o modelo
             subject = email.get('subject', '')[:200]
-            sender = email.get('from', {}).get('emailAddress', {}).get('address', 'desconhecido')
-            body_preview = email.get('bodyPreview', '')[:300]
+            prompt = self._build_urgency_prompt(email)
             
-            prompt = f"""Analise este email e classifique sua urgência em ALTA, MÉDIA ou BAIXA.
-
-ALTA: Requer ação imediata, prazos curtos, problemas críticos
-MÉDIA: Importante mas pode aguardar algumas horas
-BAIXA: Informativo, sem pressa
-
-Email:
-De: {sender}
-Assunto: {subject}
-Prévia: {body_preview}
-
-Responda APENAS com uma palavra: ALTA, MÉDIA ou BAIXA."""
-
-            logger.debug(f"Classificando email: {subject[:50]}...")
+            cached = self.cache.get(self.model, prompt)
+            if cached:
+                logger.debug(f"Classificação em cache: {cached} ({subject[:50]})")
+                return cached
             
-            result = self._call_ollama(prompt)
+            if vector is None:
+                found, vectors = self._knn_lookup([email])
+                if found:
+                    return found[email.get('id')]
+                vector = vectors.get(email.get('id'))
             
-            if result:
-                # Normaliza a resposta
-                urgency = result.upper().strip()
-                
-                # Validação
-                if urgency in ['ALTA', 'MÉDIA', 'BAIXA']:
-                    logger.info(f"Email classificado como: {urgency}")
-                    return urgency
-                else:
-                    logger.warning(f"Resposta inesperada do modelo: {result}. Usando MÉDIA como padrão.")
-                    return "MÉDIA"
-            else:
-                logger.warning("Ollama não retornou resposta. Usando MÉDIA como padrão.")
-                return "MÉDIA"
+            logger.debug(f"Classificando email: {subject[:50]}...")
+            
+            return self._accept_answer(email, prompt, vector, self._call_ollama(prompt))
         
         except Exception as e:
             logger.error(f"Erro ao classificar urgência: {e}")
-            return "MÉDIA"  # Fallback seguro
+            return ProvisionalUrgency("MÉDIA")  # Fallback seguro
+    
+    def _classify_chunk(self, emails: list) -> dict:
+        """
+        Classifica vários emails num único prompt com saída JSON.
+        
+        Returns:
+            {índice: urgência} só com as respostas válidas
+        """
+        prompt = self._build_batch_prompt(emails)
+        result = self._call_ollama(prompt, num_predict=20 * len(emails) + 20, format='json')
+        
+        return self._parse_batch_response(result, len(emails))
+    
+    def classify_batch(self, emails: list) -> dict:
+        """
+        Classifica vários emails com um prompt por lote de OLLAMA_BATCH_SIZE.
+        Emails sem resposta válida no lote caem para a classificação individual.
+        
+        Args:
+            emails: Lista de emails
+        
+        Returns:
+            {email_id: "ALTA" | "MÉDIA" | "BAIXA"}
+        """
+        # Primeiro as regras e o cache, depois o k-NN (um único pedido de embeddings)
+        results, pending = self._split_decided(emails)
+        
+        found, vectors = self._knn_lookup(pending)
+        results.update(found)
+        pending = [email for email in pending if email.get('id') not in found]
+        
+        for i in range(0, len(pending), OLLAMA_BATCH_SIZE):
+            chunk = pending[i:i + OLLAMA_BATCH_SIZE]
+            missing = chunk
+            
+            if len(chunk) > 1:
+                logger.debug(f"Classificando lote de {len(chunk)} emails...")
+                answered, missing = self._accept_batch_answers(chunk, self._classify_chunk(chunk), vectors)
+                results.update(answered)
+            
+            # Fallback: chamada individual
+            for email in missing:
+                results[email.get('id')] = self._classify_with_model(email, vectors.get(email.get('id')))
+        
+        return results
     
-    def suggest_reply(self, email: dict) -> str:
+    def suggest_reply(self, email: dict, urgency: str = None) -> str:
         """
         Gera sugestão de resposta genérica (placeholder por enquanto).
         Será implementado em sprints futuras.
+        
+        Args:
+            email: Dicionário com dados do email
+            urgency: Urgência já calculada (evita reclassificar o email)
         """
-        urgency = self.classify_urgency(email)
+        if urgency is None:
+            urgency = self.classify_urgency(email)
         
-        if urgency == "ALTA":
-            return (
-                "Olá,\n\n"
-                "Recebi seu email e vou priorizar esta demanda.\n"
-                "Retorno com mais detalhes em breve.\n\n"
-                "Atenciosamente"
+        return self._reply_template(urgency)
+    
+    def analyze_email(self, email: dict, urgency: str = None) -> dict:
+        """
+        Análise completa do email com uma única classificação no modelo:
+        urgência + sugestão de resposta (só para ALTA).
+        
+        Args:
+            email: Dicionário com dados do email
+            urgency: Urgência já calculada (ex: por classify_batch)
+        
+        Returns:
+            {'urgency': 'ALTA', 'suggestion': '...' ou None,
+             'provisional': True se a urgência veio da heurística}
+        """
+        if urgency is None:
+            urgency = self.classify_urgency(email)
+        suggestion = self.suggest_reply(email, urgency=urgency) if urgency == "ALTA" else None
+        
+        return {'urgency': urgency, 'suggestion': suggestion, 'provisional': isinstance(urgency, ProvisionalUrgency)}
+
+
+class AsyncAIService(_AIServiceBase):
+    """
+    Variante assíncrona do AIService (AsyncOllamaPool).
+    Usa os mesmos prompts, validação e cache do AIService.
+    """
+    
+    def __init__(self, cache: LLMCache = None, rules: RuleClassifier = None,
+                 knn: EmbeddingIndex = None, breaker: CircuitBreaker = None,
+                 pool: AsyncOllamaPool = None, embed_breaker: CircuitBreaker = None):
+        self.model = OLLAMA_MODEL
+        self.pool = pool or AsyncOllamaPool(timeout=OLLAMA_TIMEOUT)
+        self.cache = cache or LLMCache(
+            LLM_CACHE_FILE,
+            max_entries=LLM_CACHE_MAX_ENTRIES,
+            ttl_seconds=LLM_CACHE_TTL_HOURS * 3600
+        )
+        self.rules = rules or _default_rules()
+        self.knn = knn if knn is not None else _default_knn()
+        self.breaker = breaker or _default_breaker()
+        self.embed_breaker = embed_breaker or _default_breaker("Ollama embeddings")
+        logger.info(f"AsyncAIService inicializado com modelo: {self.model}")
+    
+    async def _call_ollama(self, prompt: str, num_predict: int = 150, format: str = '') -> str:
+        if not self.breaker.allow():
+            return None
+        
+        try:
+            response = await self.pool.chat(
+                model=self.model,
+                messages=[{'role': 'user', 'content': prompt}],
+                format=format,
+                options={
+                    'temperature': 0.3,
+                    'num_predict': num_predict,
+                }
             )
-        else:
-            return (
-                "Olá,\n\n"
-                "Obrigado pelo contato. Vou analisar e retorno em breve.\n\n"
-                "Atenciosamente"
+            self.breaker.record_success()
+            return response['message']['content'].strip()
+        
+        except Exception as e:
+            self.breaker.record_failure()
+            logger.error(f"Erro ao chamar Ollama: {e}")
+            return None
+    
+    async def _knn_lookup(self, emails: list) -> tuple:
+        """
+        Tenta classificar pelo k-NN (mesmo contrato de AIService._knn_lookup).
+        """
+        if self.knn is None or not emails or not self.embed_breaker.allow():
+            return {}, {}
+        
+        try:
+            response = await self.pool.embed(
+                model=OLLAMA_EMBED_MODEL,
+                input=[self._embedding_text(email) for email in emails]
             )
+            self.embed_breaker.record_success()
+        except Exception as e:
+            self.embed_breaker.record_failure()
+            logger.error(f"Erro ao gerar embeddings: {e}")
+            return {}, {}
+        
+        vectors = {email.get('id'): vector for email, vector in zip(emails, response['embeddings'])}
+        found = {}
+        
+        for email_id, vector in vectors.items():
+            urgency = self.knn.predict(vector)
+            if urgency:
+                found[email_id] = urgency
+        
+        return found, vectors
+    
+    async def classify_urgency(self, email: dict) -> str:
+        """
+        Classifica a urgência do email (mesmo contrato de AIService.classify_urgency).
+        """
+        urgency = self._pre_classify(email)
+        if urgency:
+            return urgency
+        
+        return await self._classify_with_model(email)
+    
+    async def _classify_with_model(self, email: dict, vector=None) -> str:
+        prompt = self._build_urgency_prompt(email)
+        
+        cached = self.cache.get(self.model, prompt)
+        if cached:
+            return cached
+        
+        if vector is None:
+            found, vectors = await self._knn_lookup([email])
+            if found:
+                return found[email.get('id')]
+            vector = vectors.get(email.get('id'))
+        
+        result = await self._call_ollama(prompt)
+        
+        # Cache e k-NN gravam em disco: fora do event loop
+        return await asyncio.to_thread(self._accept_answer, email, prompt, vector, result)
+    
+    async def classify_batch(self, emails: list) -> dict:
+        """
+        Classificação em lote (mesmo contrato de AIService.classify_batch).
+        """
+        results, pending = self._split_decided(emails)
+        
+        found, vectors = await self._knn_lookup(pending)
+        results.update(found)
+        pending = [email for email in pending if email.get('id') not in found]
+        
+        for i in range(0, len(pending), OLLAMA_BATCH_SIZE):
+            chunk = pending[i:i + OLLAMA_BATCH_SIZE]
+            missing = chunk
+            
+            if len(chunk) > 1:
+                result = await self._call_ollama(
+                    self._build_batch_prompt(chunk),
+                    num_predict=20 * len(chunk) + 20,
+                    format='json'
+                )
+                answered, missing = await asyncio.to_thread(
+                    self._accept_batch_answers, chunk, self._parse_batch_response(result, len(chunk)), vectors
+                )
+                results.update(answered)
+            
+            for email in missing:
+                results[email.get('id')] = await self._classify_with_model(email, vectors.get(email.get('id')))
+        
+        return results
+    
+    async def analyze_email(self, email: dict, urgency: str = None) -> dict:
+        """
+        Urgência + sugestão (mesmo contrato de AIService.analyze_email).
+        """
+        if urgency is None:
+            urgency = await self.classify_urgency(email)
+        
+        suggestion = self._reply_template(urgency) if urgency == "ALTA" else None
+        
+        return {'urgency': urgency, 'suggestion': suggestion, 'provisional': isinstance(urgency, ProvisionalUrgency)}
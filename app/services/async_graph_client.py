@@ -0,0 +1,156 @@
+import asyncio
+import httpx
+from app.config.settings import (
+    GRAPH_TIMEOUT, GRAPH_MAX_RETRIES, GRAPH_RETRY_DELAY, GRAPH_POOL_SIZE, GRAPH_PAGE_SIZE
+)
+from app.services.graph_client import GraphClient
+from app.utils.rate_limiter import RateLimiter, graph_rate_limiter
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class AsyncGraphClient:
+    """
+    Variante assíncrona do GraphClient (httpx.AsyncClient).
+    Mesma política de retry/timeout, sem uma thread por requisição.
+    """
+    
+    BASE_URL = GraphClient.BASE_URL
+    MAX_RETRIES = GRAPH_MAX_RETRIES
+    RETRY_DELAY = GRAPH_RETRY_DELAY  # segundos
+    TIMEOUT = GRAPH_TIMEOUT  # segundos
+    
+    def __init__(self, token_provider, pool_size: int = GRAPH_POOL_SIZE, rate_limiter: RateLimiter = None):
+        self.token_provider = token_provider
+        self.rate_limiter = rate_limiter if rate_limiter is not None else graph_rate_limiter
+        self.client = httpx.AsyncClient(
+            headers={
+                "Content-Type": "application/json"
+            },
+            timeout=self.TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size
+            )
+        )
+        logger.info(f"AsyncGraphClient inicializado (pool de {pool_size} conexões)")
+    
+    async def request(self, url: str, method: str = "GET", data: dict = None,
+                      headers: dict = None, timeout: int = None, rate_cost: dict = None) -> dict:
+        """
+        Faz requisição HTTP com retry automático.
+        Mesmo contrato de GraphClient.request.
+        """
+        if url.startswith("/"):
+            url = f"{self.BASE_URL}{url}"
+        
+        rate_cost = rate_cost or {self.rate_limiter.endpoint_of(url): 1}
+        attempt = 0
+        auth_retried = False
+        
+        while True:
+            await self.rate_limiter.acquire_async(rate_cost)
+            
+            # O TokenProvider renova em segundo plano; se ainda assim o token
+            # estiver vencendo, a renovação (rede) roda fora do loop
+            token = self.token_provider.cached_token() or await asyncio.to_thread(self.token_provider.get_token)
+            request_headers = {"Authorization": f"Bearer {token}", **(headers or {})}
+            
+            try:
+                response = await self.client.request(
+                    method, url, json=data, headers=request_headers, timeout=timeout or self.TIMEOUT
+                )
+                response.raise_for_status()
+                self.rate_limiter.record_success(rate_cost)
+                return response.json() if response.content else {}
+            
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                
+                if status == 401 and not auth_retried:
+                    # Token revogado/expirado antes da hora: renova e repete uma vez
+                    logger.warning("Token recusado pelo Graph (401). Renovando e repetindo...")
+                    await asyncio.to_thread(self.token_provider.refresh, token)
+                    auth_retried = True
+                    continue
+                elif status == 401:
+                    logger.error("Token expirado ou inválido. Necessário re-autenticar.")
+                    raise
+                elif status in (429, 503) and attempt < self.MAX_RETRIES:
+                    # A espera acontece no acquire da próxima volta (pausa o endpoint todo)
+                    delay = self.rate_limiter.throttled(rate_cost, e.response.headers.get('Retry-After'), attempt)
+                    logger.warning(f"Rate limit atingido ({status}). Aguardando {delay:.1f}s...")
+                else:
+                    log = logger.debug if status == 404 else logger.error
+                    log(f"Erro HTTP {status}: {e}")
+                    raise
+            
+            except httpx.TimeoutException:
+                logger.warning(f"Timeout na requisição. Tentativa {attempt + 1}/{self.MAX_RETRIES}")
+                if attempt >= self.MAX_RETRIES:
+                    logger.error("Max retries atingido")
+                    raise
+                await asyncio.sleep(self.RETRY_DELAY)
+            
+            except httpx.RequestError as e:
+                logger.error(f"Erro na requisição: {e}")
+                if attempt >= self.MAX_RETRIES:
+                    raise
+                await asyncio.sleep(self.RETRY_DELAY)
+            
+            attempt += 1
+    
+    async def get(self, url: str, **kwargs) -> dict:
+        return await self.request(url, "GET", **kwargs)
+    
+    async def post(self, url: str, data: dict = None, **kwargs) -> dict:
+        return await self.request(url, "POST", data=data, **kwargs)
+    
+    async def patch(self, url: str, data: dict = None, **kwargs) -> dict:
+        return await self.request(url, "PATCH", data=data, **kwargs)
+    
+    async def iter_pages(self, url: str, page_size: int = GRAPH_PAGE_SIZE, prefetch: bool = True,
+                         headers: dict = None, timeout: int = None):
+        """
+        Percorre uma coleção paginada seguindo @odata.nextLink,
+        buscando a próxima página enquanto a atual é consumida.
+        """
+        page_headers = dict(headers or {})
+        if page_size:
+            page_headers["Prefer"] = f"odata.maxpagesize={page_size}"
+        
+        def fetch(link):
+            return self.get(link, headers=page_headers, timeout=timeout)
+        
+        page = await fetch(url)
+        pending = None
+        
+        try:
+            while True:
+                next_link = page.get('@odata.nextLink')
+                pending = asyncio.ensure_future(fetch(next_link)) if (prefetch and next_link) else None
+                
+                yield page
+                
+                if not next_link:
+                    break
+                
+                page = await pending if pending else await fetch(next_link)
+                pending = None
+        
+        finally:
+            if pending and not pending.done():
+                pending.cancel()
+    
+    async def iter_items(self, url: str, **kwargs):
+        """
+        Como iter_pages, mas entrega item a item.
+        """
+        async for page in self.iter_pages(url, **kwargs):
+            for item in page.get('value', []):
+                yield item
+    
+    async def aclose(self):
+        """Fecha as conexões do pool."""
+        await self.client.aclose()
@@ -1,73 +1,110 @@
 import msal
-import pickle
+import threading
+import time
 from pathlib import Path
+from app.config.settings import TOKEN_CACHE_FILE, TOKEN_REFRESH_MARGIN_SECONDS
+from app.utils.storage import atomic_write_text
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
 
+class ReauthenticationRequired(Exception):
+    """
+    O refresh token não renova mais a sessão e o device flow não pode
+    rodar aqui (thread de trabalho ou monitor já em execução).
+    """
+
+
 class AuthService:
     """
     Serviço de autenticação com Microsoft usando MSAL.
-    Implementa cache de token para evitar re-autenticação constante.
-    """
     
-    TOKEN_CACHE_FILE = ".token_cache"
+    O cache de tokens do MSAL (contas, access e refresh tokens) é
+    persistido em disco, então reinicializações autenticam em silêncio
+    sem repetir o device flow.
+    """
     
-    def __init__(self, tenant_id: str, client_id: str, scopes: list):
+    def __init__(self, tenant_id: str, client_id: str, scopes: list, cache_file: str = TOKEN_CACHE_FILE):
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.scopes = scopes
+        self.cache_file = cache_file
+        
+        self._cache_lock = threading.Lock()
+        self.cache = msal.SerializableTokenCache()
+        self._load_token_cache()
         
         self.app = msal.PublicClientApplication(
             client_id=client_id,
-            authority=f"https://login.microsoftonline.com/{tenant_id}"
+            authority=f"https://login.microsoftonline.com/{tenant_id}",
+            token_cache=self.cache
         )
         
         logger.info("AuthService inicializado")
     
-    def _load_token_cache(self) -> dict:
-        """Carrega token do cache se existir."""
-        cache_path = Path(self.TOKEN_CACHE_FILE)
+    def _load_token_cache(self):
+        """Carrega o cache de tokens do MSAL, se existir."""
+        cache_path = Path(self.cache_file)
         
         if cache_path.exists():
             try:
-                with open(cache_path, 'rb') as f:
-                    cached = pickle.load(f)
-                    logger.info("Token carregado do cache")
-                    return cached
+                self.cache.deserialize(cache_path.read_text(encoding='utf-8'))
+                logger.info("Cache de tokens carregado")
+            except Exception as e:
+                logger.warning(f"Cache de tokens inválido, ignorando: {e}")
+    
+    def _save_token_cache(self):
+        """Grava o cache de tokens (atômico) se o MSAL alterou algo."""
+        with self._cache_lock:
+            if not self.cache.has_state_changed:
+                return
+            
+            try:
+                atomic_write_text(self.cache_file, self.cache.serialize())
+                self.cache.has_state_changed = False
+                logger.debug("Cache de tokens salvo")
             except Exception as e:
-                logger.warning(f"Erro ao carregar cache de token: {e}")
+                logger.error(f"Erro ao salvar cache de token: {e}")
+    
+    def acquire_token_silent(self, force_refresh: bool = False) -> dict:
+        """
+        Obtém token sem interação (cache do MSAL ou refresh token).
+        
+        Args:
+            force_refresh: Ignora o access token em cache e usa o refresh token
+        
+        Returns:
+            Resultado do MSAL ('access_token', 'expires_in', ...) ou None
+        """
+        accounts = self.app.get_accounts()
+        
+        if not accounts:
+            return None
+        
+        result = self.app.acquire_token_silent(self.scopes, account=accounts[0], force_refresh=force_refresh)
+        
+        if result and "access_token" in result:
+            self._save_token_cache()
+            return result
         
         return None
     
-    def _save_token_cache(self, token_data: dict):
-        """Salva token no cache."""
-        try:
-            with open(self.TOKEN_CACHE_FILE, 'wb') as f:
-                pickle.dump(token_data, f)
-                logger.info("Token salvo no cache")
-        except Exception as e:
-            logger.error(f"Erro ao salvar cache de token: {e}")
-    
-    def get_token(self) -> str:
+    def acquire_token(self) -> dict:
         """
         Obtém token de acesso. Tenta usar cache primeiro,
         senão solicita nova autenticação via device flow.
         
         Returns:
-            Access token válido
+            Resultado do MSAL ('access_token', 'expires_in', ...)
         """
         # Tenta obter token das contas em cache
-        accounts = self.app.get_accounts()
+        logger.info("Tentando autenticação silenciosa...")
+        result = self.acquire_token_silent()
         
-        if accounts:
-            logger.info("Tentando autenticação silenciosa...")
-            result = self.app.acquire_token_silent(self.scopes, account=accounts[0])
-            
-            if result and "access_token" in result:
-                logger.info("Token obtido silenciosamente (refresh)")
-                return result["access_token"]
+        if result:
+            logger.info("Token obtido silenciosamente (refresh)")
+            return result
         
         # Se não conseguiu silenciosamente, faz device flow
         logger.info("Iniciando device flow para autenticação...")
@@ -86,8 +123,8 @@ class AuthService:
             
             if "access_token" in result:
                 logger.info("Autenticação via device flow bem-sucedida")
-                self._save_token_cache(result)
-                return result["access_token"]
+                self._save_token_cache()
+                return result
             else:
                 error_msg = result.get('error_description', 'Erro desconhecido')
                 raise Exception(f"Falha na autenticação: {error_msg}")
@@ -95,3 +132,165 @@ class AuthService:
         except Exception as e:
             logger.error(f"Erro durante autenticação: {e}")
             raise
+    
+    def get_token(self) -> str:
+        """
+        Obtém access token válido (silencioso ou via device flow).
+        
+        Returns:
+            Access token válido
+        """
+        return self.acquire_token()["access_token"]
+
+
+class TokenProvider:
+    """
+    Fonte única do access token para os clientes do Graph.
+    
+    Os clientes pedem o token a cada requisição (get_token). Uma thread
+    renova o token em silêncio (acquire_token_silent) 'refresh_margin'
+    segundos antes de expirar, então o monitor roda por dias sem parar
+    para re-autenticar. Se ainda assim o Graph responder 401, o cliente
+    chama refresh() e repete a requisição uma vez.
+    
+    O device flow é interativo: só roda em start(), na thread principal.
+    Depois disso, se a renovação silenciosa falhar, get_token()/refresh()
+    levantam ReauthenticationRequired em vez de bloquear todos os
+    clientes do Graph esperando alguém digitar o código.
+    """
+    
+    RETRY_SECONDS = 60  # nova tentativa se a renovação em segundo plano falhar
+    MIN_WAIT_SECONDS = 30  # evita laço apertado com tokens de vida curta
+    
+    def __init__(self, auth: AuthService, refresh_margin: int = TOKEN_REFRESH_MARGIN_SECONDS):
+        self.auth = auth
+        self.refresh_margin = refresh_margin
+        
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        
+        self.refreshes = 0
+    
+    def _store(self, result: dict):
+        self._token = result["access_token"]
+        self._expires_at = time.monotonic() + int(result.get("expires_in", 3600))
+    
+    def _seconds_left(self) -> float:
+        return self._expires_at - time.monotonic()
+    
+    def _acquire_silent(self, force_refresh: bool = True) -> dict:
+        """Renova sem interação ou levanta ReauthenticationRequired."""
+        result = self.auth.acquire_token_silent(force_refresh=force_refresh)
+        
+        if not result:
+            logger.error("🔑 Não foi possível renovar o token em silêncio. Necessário re-autenticar.")
+            raise ReauthenticationRequired(
+                "Sessão Microsoft expirada. Reinicie o agente em um terminal para autenticar via device flow."
+            )
+        
+        return result
+    
+    def get_token(self) -> str:
+        """
+        Access token atual; renova na hora se já estiver vencendo
+        (só acontece se a renovação em segundo plano não rodou a tempo).
+        
+        Raises:
+            ReauthenticationRequired: Se a renovação silenciosa falhar
+        """
+        with self._lock:
+            if self._token is None:
+                self._store(self._acquire_silent(force_refresh=False))
+            elif self._seconds_left() <= self.refresh_margin / 2:
+                logger.info("Token perto de expirar, renovando agora...")
+                self._store(self._acquire_silent())
+                self.refreshes += 1
+            
+            return self._token
+    
+    def cached_token(self) -> str:
+        """
+        Token atual se ainda não estiver vencendo, sem bloquear nem renovar
+        (None se get_token() precisaria ir ao Azure AD). Usado pelo event
+        loop do modo async, que não pode esperar uma renovação.
+        """
+        token = self._token
+        if token is not None and self._seconds_left() > self.refresh_margin / 2:
+            return token
+        return None
+    
+    def refresh(self, rejected_token: str = None) -> str:
+        """
+        Força a renovação do token (ex: após 401).
+        
+        Args:
+            rejected_token: Token recusado pelo Graph; se outra thread já
+                trocou o token nesse meio tempo, não renova de novo
+        
+        Returns:
+            Novo access token
+        
+        Raises:
+            ReauthenticationRequired: Se a renovação silenciosa falhar
+        """
+        with self._lock:
+            if rejected_token is not None and self._token != rejected_token:
+                return self._token
+            
+            logger.info("🔑 Renovando token de acesso...")
+            self._store(self._acquire_silent())
+            self.refreshes += 1
+            return self._token
+    
+    def _refresh_loop(self):
+        """Renova o token em silêncio pouco antes de expirar."""
+        while True:
+            with self._lock:
+                wait = max(self._seconds_left() - self.refresh_margin, self.MIN_WAIT_SECONDS)
+            
+            if self._stop.wait(wait):
+                return
+            
+            try:
+                result = self.auth.acquire_token_silent(force_refresh=True)
+                
+                if result:
+                    with self._lock:
+                        self._store(result)
+                        self.refreshes += 1
+                    logger.info(f"🔑 Token renovado em segundo plano (válido por {int(self._seconds_left() / 60)} min)")
+                    continue
+                
+                logger.warning("Não foi possível renovar o token em segundo plano")
+            except Exception as e:
+                logger.warning(f"Erro ao renovar token em segundo plano: {e}")
+            
+            if self._stop.wait(self.RETRY_SECONDS):
+                return
+    
+    def start(self) -> "TokenProvider":
+        """
+        Obtém o primeiro token e inicia a renovação em segundo plano.
+        
+        Na thread principal, sem sessão em cache, abre o device flow;
+        fora dela só autentica em silêncio.
+        """
+        if threading.current_thread() is threading.main_thread():
+            with self._lock:
+                if self._token is None:
+                    self._store(self.auth.acquire_token())
+        else:
+            self.get_token()
+        
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name="token-refresh", daemon=True)
+            self._thread.start()
+        
+        return self
+    
+    def stop(self):
+        self._stop.set()
@@ -1,22 +1,42 @@
 import requests
+from itertools import islice
 from datetime import datetime, timedelta
+from app.services.graph_client import GraphClient
+from app.services.async_graph_client import AsyncGraphClient
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
 
-class CalendarService:
+class _CalendarServiceBase:
     """
-    Serviço para interação com Microsoft Graph API (calendário).
+    Montagem de URLs comum ao CalendarService e ao AsyncCalendarService.
     """
     
-    BASE_URL = "https://graph.microsoft.com/v1.0"
+    BASE_URL = GraphClient.BASE_URL
+    
+    def _events_url(self, days_ahead: int, limit: int) -> str:
+        """URL do calendarView de agora até X dias à frente."""
+        start_time = datetime.now().isoformat()
+        end_time = (datetime.now() + timedelta(days=days_ahead)).isoformat()
+        
+        return (
+            f"{self.BASE_URL}/me/calendarview"
+            f"?startDateTime={start_time}"
+            f"&endDateTime={end_time}"
+            f"&$top={limit}"
+            f"&$select=subject,start,end,location,isOnlineMeeting,onlineMeetingUrl"
+            f"&$orderby=start/dateTime"
+        )
+
+
+class CalendarService(_CalendarServiceBase):
+    """
+    Serviço para interação com Microsoft Graph API (calendário).
+    """
     
-    def __init__(self, token: str):
-        self.headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
+    def __init__(self, graph: GraphClient):
+        self.graph = graph
         logger.info("CalendarService inicializado")
     
     def get_events(self, days_ahead: int = 1, limit: int = 5) -> list:
@@ -31,24 +51,10 @@ class CalendarService:
             Lista de eventos
         """
         try:
-            # Período: de agora até X dias à frente
-            start_time = datetime.now().isoformat()
-            end_time = (datetime.now() + timedelta(days=days_ahead)).isoformat()
-            
-            url = (
-                f"{self.BASE_URL}/me/calendarview"
-                f"?startDateTime={start_time}"
-                f"&endDateTime={end_time}"
-                f"&$top={limit}"
-                f"&$select=subject,start,end,location,isOnlineMeeting,onlineMeetingUrl"
-                f"&$orderby=start/dateTime"
-            )
+            url = self._events_url(days_ahead, limit)
             
             logger.debug(f"Buscando eventos dos próximos {days_ahead} dias...")
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            events = response.json().get('value', [])
+            events = list(islice(self.graph.iter_items(url, prefetch=False), limit))
             logger.info(f"Encontrados {len(events)} eventos futuros")
             
             return events
@@ -60,3 +66,34 @@ class CalendarService:
         except Exception as e:
             logger.error(f"Erro inesperado ao buscar eventos: {e}")
             return []
+
+
+class AsyncCalendarService(_CalendarServiceBase):
+    """
+    Variante assíncrona do CalendarService.
+    """
+    
+    def __init__(self, graph: AsyncGraphClient):
+        self.graph = graph
+        logger.info("AsyncCalendarService inicializado")
+    
+    async def get_events(self, days_ahead: int = 1, limit: int = 5) -> list:
+        """
+        Busca eventos do calendário (mesmo contrato de CalendarService.get_events).
+        """
+        try:
+            url = self._events_url(days_ahead, limit)
+            
+            events = []
+            async for event in self.graph.iter_items(url, prefetch=False):
+                events.append(event)
+                if len(events) >= limit:
+                    break
+            
+            logger.info(f"Encontrados {len(events)} eventos futuros")
+            
+            return events
+        
+        except Exception as e:
+            logger.error(f"Erro ao buscar eventos: {e}")
+            return []
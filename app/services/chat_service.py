@@ -1,5 +1,11 @@
 import json
 from datetime import datetime, timedelta
+from app.config.settings import (
+    MAILBOX_RETENTION_DAYS, CHAT_RETRIEVAL_TOP_K, CHAT_CONTEXT_TOKEN_BUDGET, CHAT_RETRIEVAL_EMBEDDINGS
+)
+from app.utils.retrieval import BM25Index, rerank_with_embeddings, estimate_tokens
+from app.services.intent_router import IntentRouter
+from app.utils.conversation_memory import ConversationMemory
 from app.utils.logger import get_logger
 
 logger = get_logger()
@@ -11,98 +17,161 @@ class ChatService:
     Permite conversar com o agente sobre emails.
     """
     
-    def __init__(self, email_service, ai_service, report_service):
+    def __init__(self, email_service, ai_service, report_service, router: IntentRouter = None):
         self.email_service = email_service
         self.ai_service = ai_service
         self.report_service = report_service
-        self.conversation_history = []
+        self.router = router if router is not None else IntentRouter(email_service)
+        self.memory = ConversationMemory(ai_service.summarize_conversation)
+        self._vectors = {}  # embeddings dos emails já usados na busca semântica
         logger.info("ChatService inicializado")
     
-    def _get_email_context(self) -> str:
+    @property
+    def conversation_history(self) -> list:
+        """Mensagens recentes da conversa (as antigas estão no resumo da memória)."""
+        return self.memory.messages()
+    
+    def _get_email_context(self, question: str = "") -> str:
         """
-        Busca contexto atual dos emails para a IA.
+        Busca contexto atual dos emails para a IA: estatísticas gerais e os
+        emails mais relevantes para a pergunta, dentro do orçamento de tokens.
+        Reaproveita o contexto em cache (CHAT_CONTEXT_TTL_SECONDS) enquanto
+        não chegar email novo, sem ir ao Graph a cada pergunta.
         """
         try:
-            # Busca emails recentes (últimos 3 dias)
-            start_date = datetime.now() - timedelta(days=3)
-            start_date_iso = start_date.isoformat() + 'Z'
-            
-            url = (
-                f"{self.email_service.BASE_URL}/me/messages"
-                f"?$filter=receivedDateTime ge {start_date_iso}"
-                f"&$select=id,subject,from,receivedDateTime,isRead,hasAttachments,importance"
-                f"&$orderby=receivedDateTime desc"
-                f"&$top=50"
-            )
-            
-            result = self.email_service._make_request(url)
-            emails = result.get('value', [])
-            
-            # Resume informações importantes
-            total_emails = len(emails)
-            unread_emails = [e for e in emails if not e.get('isRead', True)]
-            with_attachments = [e for e in emails if e.get('hasAttachments', False)]
-            high_importance = [e for e in emails if e.get('importance') == 'high']
-            
-            # Agrupa remetentes
-            senders = {}
-            for email in emails:
-                sender = email.get('from', {}).get('emailAddress', {}).get('address', 'Desconhecido')
-                senders[sender] = senders.get(sender, 0) + 1
-            
-            # Top 5 remetentes
-            top_senders = sorted(senders.items(), key=lambda x: x[1], reverse=True)[:5]
-            
-            # Monta contexto
-            context = f"""CONTEXTO DA CAIXA DE ENTRADA (Últimos 3 dias):
+            context = self.email_service.context_cache.get_or_set('chat_context', self._build_email_context)
+            return context + self._build_relevant_context(question)
+        
+        except Exception as e:
+            logger.error(f"Erro ao obter contexto de emails: {e}")
+            return "Não foi possível obter informações dos emails no momento."
+    
+    def _build_email_context(self) -> str:
+        """
+        Monta o contexto a partir do espelho local.
+        """
+        # Consulta o espelho local (sincronizado por delta) dos últimos 3 dias
+        start_date = datetime.now() - timedelta(days=3)
+        since = self.email_service._to_graph_datetime(start_date)
+        mirror = self.email_service.mirror
+        
+        self.email_service.try_sync_mirror()
+        
+        stats = mirror.get_stats(since)
+        top_senders = mirror.top_senders(since, limit=5)
+        
+        # Monta contexto
+        context = f"""CONTEXTO DA CAIXA DE ENTRADA (Últimos 3 dias):
 
 ESTATÍSTICAS:
-- Total de emails: {total_emails}
-- Não lidos: {len(unread_emails)}
-- Com anexos: {len(with_attachments)}
-- Marcados como importantes: {len(high_importance)}
+- Total de emails: {stats['total']}
+- Não lidos: {stats['unread']}
+- Com anexos: {stats['with_attachments']}
+- Marcados como importantes: {stats['high_importance']}
 
 TOP 5 REMETENTES:
 """
-            for sender, count in top_senders:
-                context += f"- {sender}: {count} email(s)\n"
-            
-            # Adiciona últimos 10 assuntos
-            context += "\nÚLTIMOS 10 EMAILS:\n"
-            for idx, email in enumerate(emails[:10], 1):
-                subject = email.get('subject', 'Sem assunto')[:60]
-                sender = email.get('from', {}).get('emailAddress', {}).get('address', 'Desconhecido')
-                read_status = "✓" if email.get('isRead') else "✗"
-                context += f"{idx}. [{read_status}] {subject} (de: {sender})\n"
-            
-            return context
+        for sender, count in top_senders:
+            context += f"- {sender or 'Desconhecido'}: {count} email(s)\n"
         
-        except Exception as e:
-            logger.error(f"Erro ao obter contexto de emails: {e}")
-            return "Não foi possível obter informações dos emails no momento."
+        return context
     
-    def chat(self, user_message: str) -> str:
+    def _retrieval_index(self) -> BM25Index:
         """
-        Processa mensagem do usuário e retorna resposta da IA.
+        Índice BM25 sobre a caixa de entrada espelhada (janela de retenção).
+        Fica no cache de contexto, então é remontado quando chega email novo.
+        """
+        def build():
+            since = self.email_service._to_graph_datetime(datetime.now() - timedelta(days=MAILBOX_RETENTION_DAYS))
+            return BM25Index(self.email_service.mirror.get_messages_since(since))
         
-        Args:
-            user_message: Pergunta do usuário
+        return self.email_service.context_cache.get_or_set('retrieval_index', build)
+    
+    def _rerank(self, question: str, candidates: list) -> list:
+        """
+        Reordena os candidatos do BM25 por similaridade de embeddings.
+        Em caso de falha, mantém a ordem do BM25.
+        """
+        missing = [email for _, email in candidates if email.get('id') not in self._vectors]
+        
+        if missing:
+            vectors = self.ai_service._embed(missing)
+            if vectors is None:
+                return candidates
+            self._vectors.update(zip((email.get('id') for email in missing), vectors))
+        
+        query = self.ai_service.embed_texts([question])
+        if not query:
+            return candidates
+        
+        return rerank_with_embeddings(query[0], candidates, self._vectors)
+    
+    def _retrieve(self, question: str) -> tuple:
+        """
+        Emails mais relevantes para a pergunta.
         
         Returns:
-            Resposta da IA
+            (título da seção, lista de emails)
         """
-        try:
-            # Adiciona mensagem do usuário no histórico
-            self.conversation_history.append({
-                'role': 'user',
-                'content': user_message
-            })
-            
-            # Busca contexto dos emails
-            email_context = self._get_email_context()
-            
-            # Monta prompt para a IA
-            system_prompt = f"""Você é um assistente inteligente que ajuda o usuário a gerenciar seus emails.
+        index = self._retrieval_index()
+        candidates = index.search(question, k=CHAT_RETRIEVAL_TOP_K * 3)
+        
+        if not candidates:
+            # Pergunta genérica: os mais recentes (o espelho já vem ordenado)
+            return "EMAILS MAIS RECENTES", index.emails[:CHAT_RETRIEVAL_TOP_K]
+        
+        if CHAT_RETRIEVAL_EMBEDDINGS:
+            candidates = self._rerank(question, candidates)
+        
+        return "EMAILS RELEVANTES PARA A PERGUNTA", [email for _, email in candidates[:CHAT_RETRIEVAL_TOP_K]]
+    
+    @staticmethod
+    def _format_email(email: dict) -> str:
+        subject = email.get('subject', 'Sem assunto')[:80]
+        sender = ((email.get('from') or {}).get('emailAddress') or {}).get('address', 'Desconhecido')
+        received = email.get('receivedDateTime', '')[:16].replace('T', ' ')
+        read_status = "✓" if email.get('isRead') else "✗"
+        attachment = " 📎" if email.get('hasAttachments') else ""
+        preview = " ".join(email.get('bodyPreview', '')[:160].split())
+        return f"- [{read_status}] {received} | {subject} (de: {sender}){attachment}\n  {preview}\n"
+    
+    def _build_relevant_context(self, question: str) -> str:
+        """
+        Seção com os emails recuperados, até CHAT_CONTEXT_TOKEN_BUDGET tokens.
+        """
+        title, emails = self._retrieve(question)
+        
+        section = f"\n{title}:\n"
+        budget = CHAT_CONTEXT_TOKEN_BUDGET - estimate_tokens(section)
+        
+        for email in emails:
+            line = self._format_email(email)
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            section += line
+            budget -= cost
+        
+        return section
+    
+    def _build_messages(self, user_message: str) -> list:
+        """
+        Registra a pergunta no histórico e monta as mensagens para a IA
+        (prompt de sistema com o contexto dos emails, resumo da conversa
+        anterior e mensagens recentes).
+        """
+        # Adiciona mensagem do usuário no histórico
+        self.memory.add('user', user_message)
+        
+        # Busca contexto dos emails (relevantes para a pergunta)
+        email_context = self._get_email_context(user_message)
+        
+        summary = self.memory.summary
+        if summary:
+            email_context += f"\n\nRESUMO DA CONVERSA ATÉ AGORA:\n{summary}"
+        
+        # Monta prompt para a IA
+        system_prompt = f"""Você é um assistente inteligente que ajuda o usuário a gerenciar seus emails.
 
 {email_context}
 
@@ -120,22 +189,55 @@ EXEMPLOS DE PERGUNTAS:
 - "Me fale sobre os emails de hoje"
 - "Preciso responder algum email urgente?"
 """
+        
+        # Prepara mensagens para a IA
+        return [
+            {'role': 'system', 'content': system_prompt}
+        ] + self.memory.messages()  # Mensagens recentes, dentro do orçamento de tokens
+    
+    def _remember_answer(self, user_message: str, response: str):
+        """Adiciona a resposta completa no histórico."""
+        self.memory.add('assistant', response)
+        
+        logger.info(f"Chat - Pergunta: '{user_message[:50]}...', Resposta gerada")
+    
+    def _answer_locally(self, user_message: str) -> str:
+        """
+        Tenta responder direto do espelho local (perguntas factuais simples).
+        Em caso de acerto, a troca também vai para o histórico.
+        
+        Returns:
+            Resposta pronta ou None se a pergunta precisa do LLM
+        """
+        response = self.router.answer(user_message)
+        
+        if response is not None:
+            self.memory.add('user', user_message)
+            self.memory.add('assistant', response)
+        
+        return response
+    
+    def chat(self, user_message: str) -> str:
+        """
+        Processa mensagem do usuário e retorna resposta da IA.
+        
+        Args:
+            user_message: Pergunta do usuário
+        
+        Returns:
+            Resposta da IA
+        """
+        try:
+            response = self._answer_locally(user_message)
+            if response is not None:
+                return response
             
-            # Prepara mensagens para a IA
-            messages = [
-                {'role': 'system', 'content': system_prompt}
-            ] + self.conversation_history[-5:]  # Últimas 5 mensagens
+            messages = self._build_messages(user_message)
             
             # Chama a IA
             response = self.ai_service._call_ollama_chat(messages)
             
-            # Adiciona resposta no histórico
-            self.conversation_history.append({
-                'role': 'assistant',
-                'content': response
-            })
-            
-            logger.info(f"Chat - Pergunta: '{user_message[:50]}...', Resposta gerada")
+            self._remember_answer(user_message, response)
             
             return response
         
@@ -143,6 +245,41 @@ EXEMPLOS DE PERGUNTAS:
             logger.error(f"Erro no chat: {e}")
             return "Desculpe, tive um problema ao processar sua pergunta. Tente novamente."
     
+    def chat_stream(self, user_message: str):
+        """
+        Como chat(), mas entrega a resposta em pedaços à medida que a IA gera.
+        O texto completo vai para o histórico ao final.
+        
+        Args:
+            user_message: Pergunta do usuário
+        
+        Yields:
+            Trechos da resposta
+        """
+        parts = []
+        
+        try:
+            response = self._answer_locally(user_message)
+            if response is not None:
+                yield response
+                return
+            
+            messages = self._build_messages(user_message)
+            
+            for part in self.ai_service._call_ollama_chat_stream(messages):
+                parts.append(part)
+                yield part
+        
+        except Exception as e:
+            logger.error(f"Erro no chat: {e}")
+            if not parts:
+                yield "Desculpe, tive um problema ao processar sua pergunta. Tente novamente."
+            return
+        
+        finally:
+            if parts:
+                self._remember_answer(user_message, "".join(parts).strip())
+    
     def get_suggested_questions(self) -> list:
         """
         Retorna lista de perguntas sugeridas.
@@ -160,7 +297,7 @@ EXEMPLOS DE PERGUNTAS:
     
     def clear_history(self):
         """Limpa histórico da conversa."""
-        self.conversation_history = []
+        self.memory.clear()
         logger.info("Histórico de chat limpo")
     
     def execute_command(self, command: str) -> str:
@@ -174,7 +311,9 @@ EXEMPLOS DE PERGUNTAS:
             Resultado do comando
         """
         if command == '/resumo':
-            summary = self.report_service.get_today_summary()
+            summary = self.email_service.context_cache.get_or_set(
+                'today_summary', self.report_service.get_today_summary
+            )
             return f"""📊 RESUMO RÁPIDO
 
 Total hoje: {summary['total']}
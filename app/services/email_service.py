@@ -1,71 +1,128 @@
+import asyncio
+import httpx
 import requests
-import time
+from itertools import islice
+from urllib.parse import quote
+from datetime import datetime, timedelta
+from app.config.settings import (
+    DELTA_PAGE_SIZE, MAILBOX_DB_FILE, MAILBOX_RETENTION_DAYS, CHAT_CONTEXT_TTL_SECONDS
+)
+from app.models.email import MailboxMirror
+from app.services.graph_client import GraphClient
+from app.services.async_graph_client import AsyncGraphClient
+from app.utils.ttl_cache import TTLCache
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
 
-class EmailService:
+class _EmailServiceBase:
     """
-    Serviço para interação com Microsoft Graph API (emails).
-    Inclui retry automático e tratamento de erros.
+    Montagem das URLs de delta, parsing das páginas e manutenção do
+    espelho, comuns ao EmailService e ao AsyncEmailService.
     """
     
-    BASE_URL = "https://graph.microsoft.com/v1.0"
-    MAX_RETRIES = 3
-    RETRY_DELAY = 2  # segundos
+    BASE_URL = GraphClient.BASE_URL
     
-    def __init__(self, token: str):
-        self.headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        logger.info("EmailService inicializado")
+    # Campos usados pelo agente, relatórios e chat
+    MESSAGE_FIELDS = (
+        "id,subject,from,receivedDateTime,lastModifiedDateTime,importance,"
+        "bodyPreview,isRead,hasAttachments,conversationId"
+    )
+    
+    # Cabeçalhos que identificam listas de email (regra 'lista_de_email').
+    # Não entram no delta: são buscados só para os emails a classificar.
+    LIST_HEADERS = ('list-unsubscribe', 'list-id')
+    
+    @staticmethod
+    def _headers_url(message_id: str) -> str:
+        return f"/me/messages/{message_id}?$select=internetMessageHeaders"
+    
+    @classmethod
+    def _list_headers(cls, message: dict) -> list:
+        """Filtra o bloco de cabeçalhos, mantendo só os de lista."""
+        return [
+            header for header in message.get('internetMessageHeaders') or []
+            if header.get('name', '').lower() in cls.LIST_HEADERS
+        ]
     
-    def _make_request(self, url: str, method: str = "GET", data: dict = None, retries: int = 0):
+    @staticmethod
+    def _to_graph_datetime(value: datetime) -> str:
+        """Formata datetime no padrão aceito pelos filtros do Graph."""
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+    
+    def _initial_delta_url(self, folder: str) -> str:
         """
-        Faz requisição HTTP com retry automático.
+        URL da primeira rodada de delta: a mesma janela de retenção do
+        espelho (MAILBOX_RETENTION_DAYS), para não baixar o que o prune
+        descartaria em seguida.
         """
-        try:
-            if method == "GET":
-                response = requests.get(url, headers=self.headers, timeout=10)
-            elif method == "POST":
-                response = requests.post(url, headers=self.headers, json=data, timeout=10)
-            elif method == "PATCH":
-                response = requests.patch(url, headers=self.headers, json=data, timeout=10)
+        since = datetime.now() - timedelta(days=MAILBOX_RETENTION_DAYS)
+        return (
+            f"{self.BASE_URL}/me/mailFolders/{folder}/messages/delta"
+            f"?$select={self.MESSAGE_FIELDS}"
+            f"&$filter=receivedDateTime ge {self._to_graph_datetime(since)}"
+        )
+    
+    @staticmethod
+    def _delta_page_changes(page: dict, initial: bool, watermark: str):
+        """
+        Converte uma página de delta em mudanças.
+        
+        Returns:
+            (lista de mudanças, maior receivedDateTime visto na página)
+        """
+        changes = []
+        page_watermark = watermark
+        
+        for item in page.get('value', []):
+            if '@removed' in item:
+                changes.append({'type': 'removed', 'id': item.get('id'), 'message': None})
+                continue
             
-            response.raise_for_status()
-            return response.json()
+            received = item.get('receivedDateTime', '')
+            change_type = 'added' if initial or received > watermark else 'changed'
+            page_watermark = max(page_watermark, received)
+            
+            changes.append({'type': change_type, 'id': item.get('id'), 'message': item})
         
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 401:
-                logger.error("Token expirado ou inválido. Necessário re-autenticar.")
-                raise
-            elif e.response.status_code == 429:
-                logger.warning("Rate limit atingido. Aguardando...")
-                time.sleep(self.RETRY_DELAY * 2)
-                if retries < self.MAX_RETRIES:
-                    return self._make_request(url, method, data, retries + 1)
-            else:
-                logger.error(f"Erro HTTP {e.response.status_code}: {e}")
-                raise
-        
-        except requests.exceptions.Timeout:
-            logger.warning(f"Timeout na requisição. Tentativa {retries + 1}/{self.MAX_RETRIES}")
-            if retries < self.MAX_RETRIES:
-                time.sleep(self.RETRY_DELAY)
-                return self._make_request(url, method, data, retries + 1)
-            else:
-                logger.error("Max retries atingido")
-                raise
-        
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro na requisição: {e}")
-            if retries < self.MAX_RETRIES:
-                time.sleep(self.RETRY_DELAY)
-                return self._make_request(url, method, data, retries + 1)
-            else:
-                raise
+        return changes, page_watermark
+    
+    def _invalidate_context(self, changes: list):
+        """Descarta contexto/resumo em cache se a caixa de entrada mudou."""
+        if any(change['folder'] == 'inbox' for change in changes):
+            self.context_cache.invalidate()
+    
+    def _prune_mirror(self):
+        """Descarta do espelho o que saiu da janela de retenção."""
+        cutoff = self._to_graph_datetime(datetime.now() - timedelta(days=MAILBOX_RETENTION_DAYS))
+        removed = self.mirror.prune(cutoff)
+        if removed:
+            logger.debug(f"{removed} email(s) antigos removidos do espelho local")
+
+
+class EmailService(_EmailServiceBase):
+    """
+    Serviço para interação com Microsoft Graph API (emails).
+    Retry e tratamento de erros ficam no GraphClient compartilhado.
+    """
+    
+    def __init__(self, graph: GraphClient, mirror: MailboxMirror = None, context_cache: TTLCache = None):
+        self.graph = graph
+        
+        # Espelho local da caixa (SQLite), mantido por delta query
+        self.mirror = mirror or MailboxMirror(MAILBOX_DB_FILE)
+        
+        # Contexto do chat e resumo do dia, descartados quando chega email novo
+        self.context_cache = context_cache or TTLCache(CHAT_CONTEXT_TTL_SECONDS)
+        
+        logger.info("EmailService inicializado")
+    
+    def _make_request(self, url: str, method: str = "GET", data: dict = None, headers: dict = None):
+        """
+        Faz requisição HTTP pelo transporte compartilhado (com retry).
+        """
+        return self.graph.request(url, method=method, data=data, headers=headers)
     
     def get_unread_emails(self, limit: int = 5) -> list:
         """
@@ -82,7 +139,7 @@ class EmailService:
                 f"{self.BASE_URL}/me/messages"
                 f"?$filter=isRead eq false"
                 f"&$top={limit}"
-                f"&$select=id,subject,from,receivedDateTime,importance,bodyPreview,isRead"
+                f"&$select=id,subject,from,receivedDateTime,lastModifiedDateTime,importance,bodyPreview,isRead"
                 f"&$orderby=receivedDateTime desc"
             )
             
@@ -119,3 +176,291 @@ class EmailService:
         except Exception as e:
             logger.error(f"Erro ao marcar email como lido: {e}")
             return False
+    
+    def get_changes(self, folder: str = "inbox", state: dict = None):
+        """
+        Sincronização incremental via delta query.
+        
+        Na primeira chamada baixa a janela dos últimos MAILBOX_RETENTION_DAYS
+        dias; nas seguintes, só o que mudou desde o último deltaLink.
+        
+        Args:
+            folder: Pasta de emails (ex: 'inbox')
+            state: Estado mantido pelo chamador (ex: MailboxMirror), com
+                   'delta_link' e 'watermark'; é atualizado no lugar.
+        
+        Yields:
+            {'type': 'added' | 'changed' | 'removed' | 'reset', 'id': ..., 'message': {...}}
+            'reset' indica que o consumidor deve descartar o que tem e
+            reconstruir a partir das mudanças seguintes.
+        """
+        state = state if state is not None else {}
+        url = state.get('delta_link')
+        watermark = state.get('watermark', '')
+        initial = url is None
+        
+        if initial:
+            url = self._initial_delta_url(folder)
+            yield {'type': 'reset', 'id': None, 'message': None}
+        
+        new_watermark = watermark
+        
+        try:
+            for result in self.graph.iter_pages(url, page_size=DELTA_PAGE_SIZE):
+                changes, page_watermark = self._delta_page_changes(result, initial, watermark)
+                new_watermark = max(new_watermark, page_watermark)
+                
+                yield from changes
+                
+                delta_link = result.get('@odata.deltaLink')
+                
+                if delta_link:
+                    state.update({'delta_link': delta_link, 'watermark': new_watermark})
+                    logger.debug(f"Sincronização '{folder}' concluída")
+        
+        except requests.exceptions.HTTPError as e:
+            # deltaLink expirado: reinicia a sincronização completa
+            if e.response is not None and e.response.status_code == 410 and not initial:
+                logger.warning(f"deltaLink expirado para '{folder}'. Ressincronizando...")
+                state.clear()
+                yield from self.get_changes(folder, state)
+                return
+            raise
+    
+    def sync_mirror(self, folders: tuple = ("inbox", "sentitems")) -> list:
+        """
+        Atualiza o espelho local (SQLite) com as mudanças desde a última
+        sincronização. Cada pasta custa uma delta query.
+        
+        Args:
+            folders: Pastas espelhadas (sentitems é usada para detectar respostas)
+        
+        Returns:
+            Mudanças aplicadas, cada uma com a chave 'folder'
+        """
+        applied = []
+        
+        for folder in folders:
+            state = self.mirror.get_sync_state(folder)
+            changes = self.get_changes(folder=folder, state=state)
+            
+            for change in self.mirror.apply_changes(folder, changes, state):
+                applied.append({**change, 'folder': folder})
+        
+        self._prune_mirror()
+        self._invalidate_context(applied)
+        
+        return applied
+    
+    def get_recent_messages(self, since: datetime, sync: bool = True) -> list:
+        """
+        Retorna emails recebidos desde 'since', servidos do espelho local.
+        Se a sincronização falhar (ex: offline), usa o que já está no espelho.
+        
+        Args:
+            since: Data/hora inicial
+            sync: Se True, sincroniza o espelho antes de consultar
+        
+        Returns:
+            Lista de emails, mais recentes primeiro
+        """
+        if sync:
+            self.try_sync_mirror()
+        
+        return self.mirror.get_messages_since(self._to_graph_datetime(since))
+    
+    def fetch_messages_since(self, since: datetime, limit: int = 100) -> list:
+        """
+        Busca direto no Graph, sem o espelho, os emails da caixa de entrada
+        recebidos desde 'since' (mais recentes primeiro).
+        
+        Args:
+            since: Data/hora inicial
+            limit: Número máximo de emails
+        
+        Returns:
+            Lista de emails
+        """
+        url = (
+            f"{self.BASE_URL}/me/mailFolders/inbox/messages"
+            f"?$filter=receivedDateTime ge {self._to_graph_datetime(since)}"
+            f"&$select={self.MESSAGE_FIELDS}"
+            f"&$orderby=receivedDateTime desc"
+        )
+        return list(islice(self.graph.iter_items(url, prefetch=False), limit))
+    
+    def try_sync_mirror(self) -> bool:
+        """
+        Sincroniza o espelho sem propagar erros (consultas seguem offline).
+        
+        Returns:
+            True se sincronizou, False se usou dados locais
+        """
+        try:
+            self.sync_mirror()
+            return True
+        except Exception as e:
+            logger.warning(f"Sincronização do espelho falhou, usando dados locais: {e}")
+            return False
+    
+    def get_conversations(self, conversation_ids: list, fields: str = "id,from", top: int = 10) -> dict:
+        """
+        Busca as mensagens de várias conversas de uma vez via $batch.
+        IDs repetidos são consultados uma única vez.
+        
+        Args:
+            conversation_ids: Lista de conversationId (pode ter repetições)
+            fields: Campos a retornar de cada mensagem
+            top: Máximo de mensagens por conversa
+        
+        Returns:
+            {conversation_id: [mensagens]} (conversas com erro ficam de fora)
+        """
+        unique_ids = list(dict.fromkeys(cid for cid in conversation_ids if cid))
+        
+        requests_list = []
+        for idx, cid in enumerate(unique_ids):
+            conv_filter = quote(f"conversationId eq '{cid}'")
+            requests_list.append({
+                'id': str(idx),
+                'method': 'GET',
+                'url': f"/me/messages?$filter={conv_filter}&$select={fields}&$top={top}"
+            })
+        
+        logger.debug(f"Buscando {len(unique_ids)} conversa(s) via $batch...")
+        responses = self.graph.batch(requests_list)
+        
+        conversations = {}
+        for idx, cid in enumerate(unique_ids):
+            response = responses.get(str(idx))
+            
+            if response is None or response['status'] != 200:
+                status = response['status'] if response else 'sem resposta'
+                logger.warning(f"Erro ao buscar conversa {cid}: {status}")
+                continue
+            
+            conversations[cid] = response['body'].get('value', [])
+        
+        return conversations
+    
+    def attach_list_headers(self, emails: list):
+        """
+        Busca os cabeçalhos de lista (List-Unsubscribe, List-Id) dos emails
+        via $batch, com $select por mensagem, e grava em
+        'internetMessageHeaders' de cada um. Em caso de erro os emails
+        seguem sem cabeçalhos (a regra de lista simplesmente não casa).
+        """
+        if not emails:
+            return
+        
+        requests_list = [
+            {'id': str(idx), 'method': 'GET', 'url': self._headers_url(email['id'])}
+            for idx, email in enumerate(emails)
+        ]
+        
+        try:
+            responses = self.graph.batch(requests_list)
+        except Exception as e:
+            logger.warning(f"Erro ao buscar cabeçalhos dos emails: {e}")
+            return
+        
+        for idx, email in enumerate(emails):
+            response = responses.get(str(idx))
+            if response and response['status'] == 200:
+                email['internetMessageHeaders'] = self._list_headers(response['body'])
+
+
+class AsyncEmailService(_EmailServiceBase):
+    """
+    Variante assíncrona do EmailService (delta sync do espelho local).
+    """
+    
+    def __init__(self, graph: AsyncGraphClient, mirror: MailboxMirror = None, context_cache: TTLCache = None):
+        self.graph = graph
+        self.mirror = mirror or MailboxMirror(MAILBOX_DB_FILE)
+        self.context_cache = context_cache or TTLCache(CHAT_CONTEXT_TTL_SECONDS)
+        logger.info("AsyncEmailService inicializado")
+    
+    async def get_changes(self, folder: str = "inbox", state: dict = None):
+        """
+        Delta query assíncrona (mesmo contrato de EmailService.get_changes,
+        com o estado sempre mantido pelo chamador).
+        """
+        state = state if state is not None else {}
+        url = state.get('delta_link')
+        watermark = state.get('watermark', '')
+        initial = url is None
+        
+        if initial:
+            url = self._initial_delta_url(folder)
+            yield {'type': 'reset', 'id': None, 'message': None}
+        
+        new_watermark = watermark
+        
+        try:
+            async for result in self.graph.iter_pages(url, page_size=DELTA_PAGE_SIZE):
+                changes, page_watermark = self._delta_page_changes(result, initial, watermark)
+                new_watermark = max(new_watermark, page_watermark)
+                
+                for change in changes:
+                    yield change
+                
+                delta_link = result.get('@odata.deltaLink')
+                
+                if delta_link:
+                    state.update({'delta_link': delta_link, 'watermark': new_watermark})
+        
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 410 and not initial:
+                logger.warning(f"deltaLink expirado para '{folder}'. Ressincronizando...")
+                state.clear()
+                async for change in self.get_changes(folder, state):
+                    yield change
+                return
+            raise
+    
+    async def sync_mirror(self, folders: tuple = ("inbox", "sentitems")) -> list:
+        """
+        Atualiza o espelho local. As pastas são sincronizadas em paralelo;
+        a gravação no SQLite roda fora do event loop.
+        """
+        async def sync_folder(folder):
+            state = await asyncio.to_thread(self.mirror.get_sync_state, folder)
+            changes = [change async for change in self.get_changes(folder, state)]
+            applied = await asyncio.to_thread(self.mirror.apply_changes, folder, changes, state)
+            return [{**change, 'folder': folder} for change in applied]
+        
+        results = await asyncio.gather(*(sync_folder(folder) for folder in folders))
+        await asyncio.to_thread(self._prune_mirror)
+        
+        applied = [change for folder_changes in results for change in folder_changes]
+        self._invalidate_context(applied)
+        
+        return applied
+    
+    async def attach_list_headers(self, emails: list):
+        """
+        Versão assíncrona de EmailService.attach_list_headers (uma
+        requisição por email, em paralelo).
+        """
+        async def fetch(email):
+            try:
+                message = await self.graph.get(f"{self.BASE_URL}{self._headers_url(email['id'])}")
+                email['internetMessageHeaders'] = self._list_headers(message)
+            except Exception as e:
+                logger.debug(f"Erro ao buscar cabeçalhos do email {email['id'][:8]}...: {e}")
+        
+        await asyncio.gather(*(fetch(email) for email in emails))
+    
+    async def mark_as_read(self, email_id: str) -> bool:
+        """
+        Marca email como lido.
+        """
+        try:
+            await self.graph.patch(f"{self.BASE_URL}/me/messages/{email_id}", data={"isRead": True})
+            logger.info(f"Email {email_id[:8]}... marcado como lido")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Erro ao marcar email como lido: {e}")
+            return False
@@ -0,0 +1,299 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from app.config.settings import (
+    GRAPH_TIMEOUT, GRAPH_MAX_RETRIES, GRAPH_RETRY_DELAY, GRAPH_POOL_SIZE, GRAPH_PAGE_SIZE
+)
+from app.utils.rate_limiter import RateLimiter, graph_rate_limiter
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class GraphClient:
+    """
+    Transporte HTTP compartilhado para o Microsoft Graph.
+    Uma única Session keep-alive com pool de conexões, política única
+    de retry/timeout e estatísticas por host.
+    Usado por EmailService, CalendarService e UserService.
+    """
+    
+    BASE_URL = "https://graph.microsoft.com/v1.0"
+    MAX_RETRIES = GRAPH_MAX_RETRIES
+    RETRY_DELAY = GRAPH_RETRY_DELAY  # segundos
+    TIMEOUT = GRAPH_TIMEOUT  # segundos
+    BATCH_SIZE = 20  # limite do Graph por chamada $batch
+    
+    def __init__(self, token_provider, pool_size: int = GRAPH_POOL_SIZE, rate_limiter: RateLimiter = None):
+        # Token lido a cada requisição (TokenProvider renova antes de expirar)
+        self.token_provider = token_provider
+        self.rate_limiter = rate_limiter if rate_limiter is not None else graph_rate_limiter
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json"
+        })
+        
+        # Retries são tratados aqui, não no urllib3
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=0
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        
+        logger.info(f"GraphClient inicializado (pool de {pool_size} conexões)")
+    
+    def _record(self, url: str, elapsed: float, error: bool = False, retry: bool = False):
+        """Atualiza estatísticas do host da requisição."""
+        host = urlparse(url).netloc
+        
+        with self._stats_lock:
+            stats = self._stats.setdefault(host, {
+                'requests': 0, 'errors': 0, 'retries': 0, 'total_time': 0.0
+            })
+            stats['requests'] += 1
+            stats['total_time'] += elapsed
+            if error:
+                stats['errors'] += 1
+            if retry:
+                stats['retries'] += 1
+    
+    def request(self, url: str, method: str = "GET", data: dict = None,
+                headers: dict = None, timeout: int = None, rate_cost: dict = None) -> dict:
+        """
+        Faz requisição HTTP com retry automático.
+        
+        Args:
+            url: URL absoluta ou caminho relativo a BASE_URL (ex: '/me/messages')
+            method: GET, POST, PATCH...
+            data: Corpo JSON
+            headers: Headers extras para esta requisição
+            timeout: Timeout em segundos (padrão: GRAPH_TIMEOUT)
+            rate_cost: Fichas do limitador por endpoint (padrão: 1 no endpoint da URL)
+        
+        Returns:
+            Corpo da resposta (dict vazio se não houver conteúdo)
+        """
+        if url.startswith("/"):
+            url = f"{self.BASE_URL}{url}"
+        
+        timeout = timeout or self.TIMEOUT
+        rate_cost = rate_cost or {self.rate_limiter.endpoint_of(url): 1}
+        attempt = 0
+        auth_retried = False
+        
+        while True:
+            self.rate_limiter.acquire(rate_cost)
+            
+            token = self.token_provider.get_token()
+            request_headers = {"Authorization": f"Bearer {token}", **(headers or {})}
+            start = time.perf_counter()
+            
+            try:
+                response = self.session.request(
+                    method, url, json=data, headers=request_headers, timeout=timeout
+                )
+                self._record(url, time.perf_counter() - start, error=not response.ok, retry=attempt > 0)
+                
+                response.raise_for_status()
+                self.rate_limiter.record_success(rate_cost)
+                return response.json() if response.content else {}
+            
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code
+                
+                if status == 401 and not auth_retried:
+                    # Token revogado/expirado antes da hora: renova e repete uma vez
+                    logger.warning("Token recusado pelo Graph (401). Renovando e repetindo...")
+                    self.token_provider.refresh(token)
+                    auth_retried = True
+                    continue
+                elif status == 401:
+                    logger.error("Token expirado ou inválido. Necessário re-autenticar.")
+                    raise
+                elif status in (429, 503) and attempt < self.MAX_RETRIES:
+                    # A espera acontece no acquire da próxima volta (pausa o endpoint todo)
+                    delay = self.rate_limiter.throttled(rate_cost, e.response.headers.get('Retry-After'), attempt)
+                    logger.warning(f"Rate limit atingido ({status}). Aguardando {delay:.1f}s...")
+                else:
+                    log = logger.debug if status == 404 else logger.error
+                    log(f"Erro HTTP {status}: {e}")
+                    raise
+            
+            except requests.exceptions.Timeout:
+                self._record(url, time.perf_counter() - start, error=True, retry=attempt > 0)
+                logger.warning(f"Timeout na requisição. Tentativa {attempt + 1}/{self.MAX_RETRIES}")
+                if attempt >= self.MAX_RETRIES:
+                    logger.error("Max retries atingido")
+                    raise
+                time.sleep(self.RETRY_DELAY)
+            
+            except requests.exceptions.RequestException as e:
+                self._record(url, time.perf_counter() - start, error=True, retry=attempt > 0)
+                logger.error(f"Erro na requisição: {e}")
+                if attempt >= self.MAX_RETRIES:
+                    raise
+                time.sleep(self.RETRY_DELAY)
+            
+            attempt += 1
+    
+    def get(self, url: str, **kwargs) -> dict:
+        return self.request(url, "GET", **kwargs)
+    
+    def post(self, url: str, data: dict = None, **kwargs) -> dict:
+        return self.request(url, "POST", data=data, **kwargs)
+    
+    def patch(self, url: str, data: dict = None, **kwargs) -> dict:
+        return self.request(url, "PATCH", data=data, **kwargs)
+    
+    def iter_pages(self, url: str, page_size: int = GRAPH_PAGE_SIZE, prefetch: bool = True,
+                   headers: dict = None, timeout: int = None):
+        """
+        Percorre uma coleção paginada seguindo @odata.nextLink.
+        Enquanto o consumidor processa uma página, a próxima já é
+        buscada em segundo plano (prefetch).
+        
+        Args:
+            url: URL da primeira página
+            page_size: Tamanho de página pedido via 'Prefer: odata.maxpagesize'
+            prefetch: Se True, busca a próxima página em paralelo
+            headers: Headers extras
+            timeout: Timeout por página
+        
+        Yields:
+            Cada página (dict com 'value', '@odata.nextLink'/'@odata.deltaLink')
+        """
+        page_headers = dict(headers or {})
+        if page_size:
+            page_headers["Prefer"] = f"odata.maxpagesize={page_size}"
+        
+        def fetch(link):
+            return self.get(link, headers=page_headers, timeout=timeout)
+        
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        
+        try:
+            page = fetch(url)
+            
+            while True:
+                next_link = page.get('@odata.nextLink')
+                pending = executor.submit(fetch, next_link) if (executor and next_link) else None
+                
+                yield page
+                
+                if not next_link:
+                    break
+                
+                page = pending.result() if pending else fetch(next_link)
+        
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def iter_items(self, url: str, **kwargs):
+        """
+        Como iter_pages, mas entrega item a item (campo 'value' de cada página).
+        """
+        for page in self.iter_pages(url, **kwargs):
+            yield from page.get('value', [])
+    
+    def batch(self, requests_list: list) -> dict:
+        """
+        Executa várias requisições GET/POST via JSON $batch do Graph,
+        em lotes de até BATCH_SIZE sub-requisições por chamada.
+        Sub-requisições com 429/503 são reenviadas no lote seguinte, depois
+        da pausa indicada pelo Retry-After. Cada sub-requisição conta no
+        orçamento do seu próprio endpoint.
+        
+        Args:
+            requests_list: [{'id': '1', 'method': 'GET', 'url': '/me/messages?...'}]
+                           (url relativa à versão da API)
+        
+        Returns:
+            {id: {'status': 200, 'body': {...}}}
+        """
+        pending = list(requests_list)
+        responses = {}
+        attempt = 0
+        
+        while pending:
+            retry = []
+            retry_after = None
+            
+            for i in range(0, len(pending), self.BATCH_SIZE):
+                chunk = pending[i:i + self.BATCH_SIZE]
+                by_id = {r['id']: r for r in chunk}
+                
+                result = self.post("/$batch", data={'requests': chunk}, rate_cost=self._batch_cost(chunk))
+                
+                for item in result.get('responses', []):
+                    status = item.get('status', 0)
+                    if status in (429, 503) and attempt < self.MAX_RETRIES:
+                        retry.append(by_id[item['id']])
+                        seconds = RateLimiter.parse_retry_after((item.get('headers') or {}).get('Retry-After'))
+                        if seconds is not None:
+                            retry_after = max(retry_after or 0.0, seconds)
+                        continue
+                    responses[item['id']] = {'status': status, 'body': item.get('body', {})}
+            
+            if retry:
+                delay = self.rate_limiter.throttled(self._batch_cost(retry), retry_after, attempt)
+                logger.warning(f"{len(retry)} sub-requisição(ões) do batch limitadas. Aguardando {delay:.1f}s...")
+                attempt += 1
+            
+            pending = retry
+        
+        return responses
+    
+    def _batch_cost(self, requests_list: list) -> dict:
+        """Fichas do limitador por endpoint das sub-requisições."""
+        costs = {}
+        for r in requests_list:
+            endpoint = self.rate_limiter.endpoint_of(r['url'])
+            costs[endpoint] = costs.get(endpoint, 0) + 1
+        return costs
+    
+    def pool_stats(self) -> dict:
+        """
+        Estatísticas por host: requisições, erros, retries, latência média
+        e conexões TCP efetivamente abertas pelo pool.
+        
+        Returns:
+            {'graph.microsoft.com': {'requests': 120, 'connections': 4, ...}}
+        """
+        with self._stats_lock:
+            result = {
+                host: {
+                    'requests': s['requests'],
+                    'errors': s['errors'],
+                    'retries': s['retries'],
+                    'avg_ms': round(s['total_time'] / s['requests'] * 1000, 1) if s['requests'] else 0.0,
+                    'connections': 0
+                }
+                for host, s in self._stats.items()
+            }
+        
+        try:
+            pools = self.adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+                if host in result:
+                    result[host]['connections'] += pool.num_connections
+        except Exception as e:
+            logger.debug(f"Não foi possível ler estatísticas do pool: {e}")
+        
+        return result
+    
+    def close(self):
+        """Fecha as conexões do pool."""
+        self.session.close()
@@ -0,0 +1,223 @@
+import re
+import threading
+from datetime import datetime, timedelta
+from app.utils.retrieval import normalize_text
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class IntentRouter:
+    """
+    Responde perguntas factuais do chat direto do espelho local (SQLite),
+    sem chamar o LLM: não lidos, anexos, último email, remetentes mais
+    frequentes, emails de hoje, importantes e sem resposta.
+    
+    Só perguntas curtas que casam com um padrão conhecido e não têm
+    qualificador são respondidas aqui. "Quantos emails do Pedro hoje?" ou
+    "Resuma o último email" pedem filtro ou análise que as consultas fixas
+    não fazem, então seguem para o modelo. O mesmo vale para período ou
+    estado de leitura que a consulta não respeita: "não lidos hoje" não é
+    o total de não lidos, e "últimos 3 meses" não é a janela fixa de 7 dias.
+    """
+    
+    MAX_WORDS = 10  # perguntas mais longas costumam pedir análise, não consulta
+    
+    # (intenção, padrão sobre o texto em minúsculas e sem acentos)
+    INTENTS = [
+        ('unread_count', re.compile(r"\bquant[oa]s\b.*\bnao lid[oa]s?\b")),
+        ('today', re.compile(r"\b(quant[oa]s\b.*\bhoje\b|emails? de hoje\b)")),
+        ('attachments', re.compile(r"^(ha|tem|tenho|existe|existem|algum|quais)\b.*\banexos?\b")),
+        ('last_email', re.compile(r"\bultim[oa]\b.*\b(email|mensagem)\b")),
+        ('top_senders', re.compile(r"\bquem\b.*\bmais\b.*\b(enviou|enviaram|mandou|mandaram|envia|manda)\b")),
+        ('unanswered', re.compile(r"\b(preciso responder|sem resposta|nao respondi)\b")),
+        ('important', re.compile(r"^(ha|tem|tenho|existe|existem|algum|quais)\b.*\b(importantes?|urgentes?)\b")),
+    ]
+    
+    # Palavras de tempo/lugar que podem vir depois de "de/do/da" sem restringir a consulta
+    _NEUTRAL = r"hoje|agora|semana|dia|caixa|entrada"
+    
+    # Remetente, assunto ou destinatário ("do João", "sobre o contrato", "para a Ana")
+    QUALIFIER = re.compile(
+        rf"\b(?:(?:do|da|dos|das|de|para|por)\s+(?!(?:{_NEUTRAL})\b)\w+|sobre|referente|assunto)\b"
+    )
+    
+    # Pedidos de análise ou redação, que precisam do modelo
+    ACTION = re.compile(
+        r"\b(?:resum\w*|o que (?:diz|dizem|fala|falam)|explic\w*|detalh\w*|fale|fala|conte|"
+        r"analis\w*|traduz\w*|respond[ae]|escrev\w*|redij\w*|redigir|sugir\w*|sugest\w*)\b"
+    )
+    
+    # Período pedido na pergunta ("hoje", "últimos 3 meses", "este ano")
+    PERIOD = re.compile(
+        r"\b(?:hoje|ontem|semanas?|mes|meses|anos?|dias?|horas?|desde|periodo|"
+        r"ultim[oa]s\s+\d+|\d+\s+(?:dias?|semanas?|meses|anos?|horas?))\b"
+    )
+    
+    # Estado de leitura ("não lido", "lidos")
+    READ_STATE = re.compile(r"\blid[oa]s?\b")
+    
+    # Períodos que a consulta fixa de cada intenção já responde
+    # (top_senders e unanswered cobrem os últimos 7 dias, ~"esta semana")
+    PERIODS_ANSWERED = {
+        'today': {'hoje'},
+        'top_senders': {'semana'},
+        'unanswered': {'semana'},
+    }
+    
+    def __init__(self, email_service):
+        self.email_service = email_service
+        self._lock = threading.Lock()
+        self.answered = {name: 0 for name, _ in self.INTENTS}
+    
+    def match(self, question: str) -> str:
+        """
+        Identifica a intenção da pergunta.
+        
+        Returns:
+            Nome da intenção ou None se a pergunta deve ir para o LLM
+        """
+        text = normalize_text(question).strip()
+        
+        if len(text.split()) > self.MAX_WORDS:
+            return None
+        
+        if self.QUALIFIER.search(text) or self.ACTION.search(text):
+            return None
+        
+        for name, pattern in self.INTENTS:
+            if pattern.search(text):
+                return None if self._has_unanswerable_filter(name, text) else name
+        
+        return None
+    
+    def _has_unanswerable_filter(self, intent: str, text: str) -> bool:
+        """
+        True se a pergunta restringe período ou estado de leitura de um
+        jeito que a consulta fixa da intenção não respeita.
+        """
+        periods = {m.group(0) for m in self.PERIOD.finditer(text)}
+        if periods - self.PERIODS_ANSWERED.get(intent, set()):
+            return True
+        
+        return intent != 'unread_count' and bool(self.READ_STATE.search(text))
+    
+    def answer(self, question: str) -> str:
+        """
+        Responde a pergunta a partir do espelho local, se for uma consulta conhecida.
+        
+        Returns:
+            Resposta pronta ou None (pergunta aberta, vai para o LLM)
+        """
+        intent = self.match(question)
+        if intent is None:
+            return None
+        
+        try:
+            self._refresh()
+            response = getattr(self, f"_answer_{intent}")()
+        except Exception as e:
+            logger.error(f"Erro ao responder '{intent}' localmente: {e}")
+            return None
+        
+        with self._lock:
+            self.answered[intent] += 1
+        
+        logger.info(f"⚡ Chat - Pergunta respondida localmente ({intent}), sem LLM")
+        return response
+    
+    def _refresh(self):
+        """
+        Sincroniza o espelho no máximo uma vez por validade do cache de
+        contexto (CHAT_CONTEXT_TTL_SECONDS).
+        """
+        cache = self.email_service.context_cache
+        
+        if cache.get('mirror_synced') is None:
+            self.email_service.try_sync_mirror()
+            cache.set('mirror_synced', True)
+    
+    def _since(self, days: int) -> str:
+        return self.email_service._to_graph_datetime(datetime.now() - timedelta(days=days))
+    
+    @staticmethod
+    def _describe(email: dict) -> str:
+        subject = email.get('subject', 'Sem assunto')[:60]
+        sender = ((email.get('from') or {}).get('emailAddress') or {}).get('address', 'Desconhecido')
+        return f"• {subject} (de: {sender})"
+    
+    def _list(self, emails: list, limit: int = 5) -> str:
+        lines = [self._describe(email) for email in emails[:limit]]
+        if len(emails) > limit:
+            lines.append(f"... e mais {len(emails) - limit}")
+        return "\n".join(lines)
+    
+    def _answer_unread_count(self) -> str:
+        count = self.email_service.mirror.count_unread()
+        
+        if count == 0:
+            return "Você não tem emails não lidos na caixa de entrada. 🎉"
+        return f"Você tem {count} email(s) não lido(s) na caixa de entrada."
+    
+    def _answer_today(self) -> str:
+        today = self.email_service._to_graph_datetime(
+            datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        )
+        emails = self.email_service.mirror.get_messages_since(today)
+        
+        if not emails:
+            return "Você ainda não recebeu emails hoje."
+        
+        unread = sum(1 for email in emails if not email.get('isRead'))
+        return f"Hoje você recebeu {len(emails)} email(s), {unread} não lido(s):\n{self._list(emails)}"
+    
+    def _answer_attachments(self) -> str:
+        emails = [
+            email for email in self.email_service.mirror.get_messages_since(self._since(3))
+            if email.get('hasAttachments')
+        ]
+        
+        if not emails:
+            return "Não há emails com anexos nos últimos 3 dias."
+        return f"Sim, {len(emails)} email(s) com anexos nos últimos 3 dias:\n{self._list(emails)}"
+    
+    def _answer_last_email(self) -> str:
+        emails = self.email_service.mirror.get_messages_since("", limit=1)
+        
+        if not emails:
+            return "Não encontrei emails na sua caixa de entrada."
+        
+        email = emails[0]
+        received = email.get('receivedDateTime', '')[:16].replace('T', ' ')
+        preview = " ".join(email.get('bodyPreview', '')[:200].split())
+        return f"O último email que você recebeu:\n{self._describe(email)}\nRecebido: {received}\n{preview}"
+    
+    def _answer_top_senders(self) -> str:
+        senders = self.email_service.mirror.top_senders(self._since(7), limit=5)
+        
+        if not senders:
+            return "Você não recebeu emails nos últimos 7 dias."
+        
+        lines = [f"{idx}. {sender or 'Desconhecido'}: {count} email(s)" for idx, (sender, count) in enumerate(senders, 1)]
+        return "Quem mais te enviou emails nos últimos 7 dias:\n" + "\n".join(lines)
+    
+    def _answer_unanswered(self) -> str:
+        emails = self.email_service.mirror.get_unanswered(self._since(7))
+        
+        if not emails:
+            return "Nenhum email sem resposta nos últimos 7 dias. ✅"
+        return f"{len(emails)} email(s) sem resposta nos últimos 7 dias:\n{self._list(emails)}"
+    
+    def _answer_important(self) -> str:
+        emails = [
+            email for email in self.email_service.mirror.get_messages_since(self._since(3))
+            if email.get('importance') == 'high'
+        ]
+        
+        if not emails:
+            return "Nenhum email marcado como importante nos últimos 3 dias."
+        return f"{len(emails)} email(s) marcado(s) como importante(s) nos últimos 3 dias:\n{self._list(emails)}"
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.answered)
@@ -0,0 +1,171 @@
+import itertools
+import threading
+import time
+from ollama import Client, AsyncClient
+from app.config.settings import OLLAMA_HOSTS, OLLAMA_TIMEOUT, OLLAMA_KEEP_ALIVE
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class OllamaPool:
+    """
+    Clientes Ollama persistentes, um por host configurado (OLLAMA_HOSTS).
+    
+    Cada chamada vai para o host com menos requisições em andamento,
+    sempre com keep_alive para o modelo continuar carregado entre os ciclos
+    do agente. Separa a latência de chamadas com carga do modelo (cold
+    start) das chamadas com o modelo já residente (warm).
+    """
+    
+    COLD_LOAD_SECONDS = 0.5  # load_duration acima disso conta como cold start
+    
+    def __init__(self, hosts: list = None, timeout: int = OLLAMA_TIMEOUT, keep_alive: str = OLLAMA_KEEP_ALIVE):
+        self.hosts = list(hosts or OLLAMA_HOSTS)
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.clients = {host: self._make_client(host, timeout) for host in self.hosts}
+        
+        self._lock = threading.Lock()
+        self._in_flight = {host: 0 for host in self.hosts}
+        self._round_robin = itertools.count()
+        self._stats = {
+            host: {'cold': 0, 'cold_time': 0.0, 'warm': 0, 'warm_time': 0.0, 'errors': 0}
+            for host in self.hosts
+        }
+        
+        logger.info(f"{type(self).__name__} inicializado ({len(self.hosts)} host(s), keep_alive={keep_alive})")
+    
+    def _make_client(self, host: str, timeout: int):
+        return Client(host=host, timeout=timeout)
+    
+    def _acquire(self) -> str:
+        """Escolhe o host com menos chamadas em andamento (empate: rodízio)."""
+        with self._lock:
+            offset = next(self._round_robin)
+            order = self.hosts[offset % len(self.hosts):] + self.hosts[:offset % len(self.hosts)]
+            host = min(order, key=lambda h: self._in_flight[h])
+            self._in_flight[host] += 1
+            return host
+    
+    def _release(self, host: str, elapsed: float, response=None):
+        """Libera o host e registra a latência como cold ou warm."""
+        with self._lock:
+            self._in_flight[host] -= 1
+            stats = self._stats[host]
+            
+            if response is None:
+                stats['errors'] += 1
+                return
+            
+            load_seconds = (response.get('load_duration') or 0) / 1e9
+            kind = 'cold' if load_seconds > self.COLD_LOAD_SECONDS else 'warm'
+            stats[kind] += 1
+            stats[f'{kind}_time'] += elapsed
+        
+        if kind == 'cold':
+            logger.info(f"🧊 Cold start no Ollama ({host}): {elapsed:.1f}s, {load_seconds:.1f}s carregando o modelo")
+    
+    def _call(self, method: str, **kwargs):
+        host = self._acquire()
+        start = time.perf_counter()
+        response = None
+        
+        try:
+            response = getattr(self.clients[host], method)(keep_alive=self.keep_alive, **kwargs)
+            return response
+        finally:
+            self._release(host, time.perf_counter() - start, response)
+    
+    def chat(self, **kwargs):
+        return self._call('chat', **kwargs)
+    
+    def embed(self, **kwargs):
+        return self._call('embed', **kwargs)
+    
+    def chat_stream(self, **kwargs):
+        """
+        Chat em streaming: entrega os pedaços da resposta à medida que o
+        modelo gera. O host fica ocupado até o último pedaço.
+        """
+        host = self._acquire()
+        start = time.perf_counter()
+        last = None
+        
+        try:
+            for chunk in self.clients[host].chat(stream=True, keep_alive=self.keep_alive, **kwargs):
+                last = chunk
+                yield chunk
+        finally:
+            self._release(host, time.perf_counter() - start, last if last and last.get('done') else None)
+    
+    def warm_up(self, model: str):
+        """
+        Carrega o modelo em todos os hosts (prompt vazio só carrega o modelo).
+        """
+        for host in self.hosts:
+            try:
+                start = time.perf_counter()
+                self.clients[host].generate(model=model, prompt='', keep_alive=self.keep_alive)
+                logger.info(f"🔥 Modelo {model} carregado em {host} ({time.perf_counter() - start:.1f}s)")
+            except Exception as e:
+                logger.warning(f"Falha ao pré-carregar {model} em {host}: {e}")
+    
+    def warm_up_in_background(self, model: str) -> threading.Thread:
+        """Pré-carrega o modelo sem bloquear a inicialização."""
+        thread = threading.Thread(target=self.warm_up, args=(model,), name="ollama-warmup", daemon=True)
+        thread.start()
+        return thread
+    
+    def stats(self) -> dict:
+        """
+        Latência média por host, separando cold start de chamadas warm.
+        
+        Returns:
+            {'http://localhost:11434': {'cold': 1, 'cold_ms': 8200.0, 'warm': 40, 'warm_ms': 900.0, ...}}
+        """
+        with self._lock:
+            return {
+                host: {
+                    'in_flight': self._in_flight[host],
+                    'cold': s['cold'],
+                    'cold_ms': round(s['cold_time'] / s['cold'] * 1000, 1) if s['cold'] else 0.0,
+                    'warm': s['warm'],
+                    'warm_ms': round(s['warm_time'] / s['warm'] * 1000, 1) if s['warm'] else 0.0,
+                    'errors': s['errors']
+                }
+                for host, s in self._stats.items()
+            }
+
+
+class AsyncOllamaPool(OllamaPool):
+    """Variante assíncrona do OllamaPool (ollama.AsyncClient)."""
+    
+    def _make_client(self, host: str, timeout: int):
+        return AsyncClient(host=host, timeout=timeout)
+    
+    async def _call(self, method: str, **kwargs):
+        host = self._acquire()
+        start = time.perf_counter()
+        response = None
+        
+        try:
+            response = await getattr(self.clients[host], method)(keep_alive=self.keep_alive, **kwargs)
+            return response
+        finally:
+            self._release(host, time.perf_counter() - start, response)
+    
+    async def chat(self, **kwargs):
+        return await self._call('chat', **kwargs)
+    
+    async def embed(self, **kwargs):
+        return await self._call('embed', **kwargs)
+    
+    async def warm_up(self, model: str):
+        for host in self.hosts:
+            try:
+                start = time.perf_counter()
+                await self.clients[host].generate(model=model, prompt='', keep_alive=self.keep_alive)
+                logger.info(f"🔥 Modelo {model} carregado em {host} ({time.perf_counter() - start:.1f}s)")
+            except Exception as e:
+                logger.warning(f"Falha ao pré-carregar {model} em {host}: {e}")
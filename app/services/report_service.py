@@ -28,22 +28,11 @@ class ReportService:
             }
         """
         try:
-            # Busca emails recebidos hoje
+            # Busca emails recebidos hoje (espelho sincronizado por delta)
             today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_start_iso = today_start.isoformat() + 'Z'
-            
-            url = (
-                f"{self.email_service.BASE_URL}/me/messages"
-                f"?$filter=receivedDateTime ge {today_start_iso}"
-                f"&$select=id,subject,from,receivedDateTime,hasAttachments,bodyPreview"
-                f"&$orderby=receivedDateTime desc"
-                f"&$top=100"
-            )
             
             logger.debug("Buscando emails recebidos hoje...")
-            result = self.email_service._make_request(url)
-            
-            emails = result.get('value', [])
+            emails = self.email_service.get_recent_messages(since=today_start)
             
             # Conta emails com/sem anexo
             with_attachments = [e for e in emails if e.get('hasAttachments', False)]
@@ -73,8 +62,9 @@ class ReportService:
         """
         Busca emails SEM RESPOSTA nos últimos X dias.
         
-        NOTA: Verifica se há emails na thread de conversa.
-        Se só tem 1 email = sem resposta.
+        NOTA: Verifica no espelho local se há emails de outro remetente
+        na mesma conversa. Se não houver = sem resposta. Enquanto os itens
+        enviados não foram sincronizados, as conversas vêm do Graph ($batch).
         
         Args:
             days: Número de dias para verificar
@@ -85,54 +75,18 @@ class ReportService:
         try:
             # Data de início (X dias atrás)
             start_date = datetime.now() - timedelta(days=days)
-            start_date_iso = start_date.isoformat() + 'Z'
-            
-            # Busca emails recebidos (não enviados por mim)
-            url = (
-                f"{self.email_service.BASE_URL}/me/messages"
-                f"?$filter=receivedDateTime ge {start_date_iso}"
-                f"&$select=id,subject,from,receivedDateTime,conversationId,isRead"
-                f"&$orderby=receivedDateTime desc"
-                f"&$top=100"
-            )
             
             logger.debug(f"Buscando emails dos últimos {days} dias...")
-            result = self.email_service._make_request(url)
-            
-            emails = result.get('value', [])
-            
-            # Para cada email, verifica se tem respostas
-            unanswered = []
+            self.email_service.try_sync_mirror()
             
-            for email in emails:
-                conversation_id = email.get('conversationId')
-                
-                # Busca emails na mesma conversa
-                conv_url = (
-                    f"{self.email_service.BASE_URL}/me/messages"
-                    f"?$filter=conversationId eq '{conversation_id}'"
-                    f"&$select=id,from"
-                    f"&$top=10"
+            if self.email_service.mirror.is_synced('sentitems'):
+                # Consulta local no espelho (inbox + itens enviados), sincronizado por delta
+                unanswered = self.email_service.mirror.get_unanswered(
+                    self.email_service._to_graph_datetime(start_date)
                 )
-                
-                try:
-                    conv_result = self.email_service._make_request(conv_url)
-                    thread_emails = conv_result.get('value', [])
-                    
-                    # Verifica se EU respondi (se tem email MEU na thread)
-                    my_replies = [
-                        e for e in thread_emails
-                        if e.get('from', {}).get('emailAddress', {}).get('address', '').lower() 
-                        != email.get('from', {}).get('emailAddress', {}).get('address', '').lower()
-                    ]
-                    
-                    # Se não tem respostas minhas, adiciona na lista
-                    if len(my_replies) == 0:
-                        unanswered.append(email)
-                
-                except Exception as e:
-                    logger.warning(f"Erro ao verificar conversa {conversation_id}: {e}")
-                    continue
+            else:
+                # Espelho frio: sem os itens enviados, todo email pareceria sem resposta
+                unanswered = self._get_unanswered_from_graph(start_date)
             
             logger.info(f"Encontrados {len(unanswered)} emails sem resposta")
             
@@ -142,6 +96,37 @@ class ReportService:
             logger.error(f"Erro ao buscar emails sem resposta: {e}")
             return []
     
+    def _get_unanswered_from_graph(self, start_date: datetime) -> List[Dict]:
+        """
+        Emails sem resposta consultando as conversas no Graph, em lotes
+        de $batch com conversationId deduplicado (uma ida por até 20 conversas).
+        """
+        emails = self.email_service.fetch_messages_since(start_date)
+        conversations = self.email_service.get_conversations(
+            [email.get('conversationId') for email in emails]
+        )
+        
+        unanswered = []
+        
+        for email in emails:
+            thread_emails = conversations.get(email.get('conversationId'))
+            
+            # Conversa que não veio (erro no lote): não dá para afirmar que está sem resposta
+            if thread_emails is None:
+                continue
+            
+            sender = self._sender_of(email)
+            
+            # Verifica se EU respondi (se tem email de outro remetente na thread)
+            if not any(self._sender_of(e) != sender for e in thread_emails):
+                unanswered.append(email)
+        
+        return unanswered
+    
+    @staticmethod
+    def _sender_of(email: dict) -> str:
+        return (((email.get('from') or {}).get('emailAddress') or {}).get('address') or '').lower()
+    
     def format_today_summary(self, summary: Dict) -> str:
         """
         Formata resumo do dia em texto legível.
@@ -162,7 +147,7 @@ class ReportService:
             lines.append("-" * 80)
             
             for idx, email in enumerate(summary['emails'][:20], 1):  # Limita em 20
-                sender = email.get('from', {}).get('emailAddress', {}).get('address', 'Desconhecido')
+                sender = ((email.get('from') or {}).get('emailAddress') or {}).get('address', 'Desconhecido')
                 subject = email.get('subject', 'Sem assunto')[:50]
                 received = email.get('receivedDateTime', '')[:16]  # Só data e hora
                 has_attachment = "📎" if email.get('hasAttachments') else "  "
@@ -190,7 +175,7 @@ class ReportService:
             lines.append("\n" + "-" * 80)
             
             for idx, email in enumerate(emails[:30], 1):  # Limita em 30
-                sender = email.get('from', {}).get('emailAddress', {}).get('address', 'Desconhecido')
+                sender = ((email.get('from') or {}).get('emailAddress') or {}).get('address', 'Desconhecido')
                 subject = email.get('subject', 'Sem assunto')[:50]
                 received = email.get('receivedDateTime', '')[:10]  # Só data
                 
@@ -1,15 +1,22 @@
+import asyncio
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from app.config.settings import PRESENCE_MAX_WORKERS, GRAPH_PAGE_SIZE
+from app.services.graph_client import GraphClient
+from app.services.async_graph_client import AsyncGraphClient
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
 
-class UserService:
+class _UserServiceBase:
     """
-    Serviço para interação com usuários e presença no Microsoft Graph.
+    Montagem de URLs e tratamento das respostas de usuários/presença,
+    comuns ao UserService e ao AsyncUserService.
     """
     
-    BASE_URL = "https://graph.microsoft.com/v1.0"
+    BASE_URL = GraphClient.BASE_URL
+    PRESENCE_CHUNK_SIZE = 650  # limite do endpoint getPresencesByUserId
     
     # Mapeamento de status para emoji e descrição
     PRESENCE_MAP = {
@@ -32,11 +39,67 @@ class UserService:
         'UrgentInterruptionsOnly': {'emoji': '🚨', 'description': 'Apenas Urgências'},
     }
     
-    def __init__(self, token: str):
-        self.headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
+    def _users_url(self) -> str:
+        return (
+            f"{self.BASE_URL}/users"
+            f"?$select=id,displayName,mail,userPrincipalName"
+            f"&$top={GRAPH_PAGE_SIZE}"
+        )
+    
+    @staticmethod
+    def _parse_presences(result: dict) -> dict:
+        return {
+            p.get('id'): {
+                'availability': p.get('availability', 'Unknown'),
+                'activity': p.get('activity', 'Unknown')
+            }
+            for p in result.get('value', [])
         }
+    
+    def _chunk_ids(self, user_ids: list) -> list:
+        return [
+            user_ids[i:i + self.PRESENCE_CHUNK_SIZE]
+            for i in range(0, len(user_ids), self.PRESENCE_CHUNK_SIZE)
+        ]
+    
+    def _merge_presences(self, users: list, presences: dict) -> list:
+        """
+        Junta usuários e presenças no formato exibido pelo menu.
+        """
+        result = []
+        for user in users:
+            user_id = user.get('id')
+            display_name = user.get('displayName', 'Sem nome')
+            email = user.get('mail') or user.get('userPrincipalName', 'Sem email')
+            
+            # Presença do lote (Unknown se não veio)
+            presence = presences.get(user_id, {'availability': 'Unknown', 'activity': 'Unknown'})
+            availability = presence['availability']
+            
+            # Mapeia para formato amigável
+            presence_info = self.PRESENCE_MAP.get(
+                availability,
+                {'emoji': '❓', 'description': availability}
+            )
+            
+            result.append({
+                'name': display_name,
+                'email': email,
+                'status': availability,
+                'emoji': presence_info['emoji'],
+                'status_description': presence_info['description']
+            })
+        
+        return result
+
+
+class UserService(_UserServiceBase):
+    """
+    Serviço para interação com usuários e presença no Microsoft Graph.
+    """
+    
+    def __init__(self, graph: GraphClient):
+        self.graph = graph
         logger.info("UserService inicializado")
     
     def get_all_users(self) -> list:
@@ -47,13 +110,10 @@ class UserService:
             Lista de usuários com id, displayName, email
         """
         try:
-            url = f"{self.BASE_URL}/users?$select=id,displayName,mail,userPrincipalName"
+            url = self._users_url()
             
             logger.debug("Buscando usuários da organização...")
-            response = requests.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            
-            users = response.json().get('value', [])
+            users = list(self.graph.iter_items(url, page_size=None, timeout=15))
             logger.info(f"Encontrados {len(users)} usuários")
             
             return users
@@ -75,10 +135,7 @@ class UserService:
         try:
             url = f"{self.BASE_URL}/users/{user_id}/presence"
             
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            presence = response.json()
+            presence = self.graph.get(url)
             return {
                 'availability': presence.get('availability', 'Unknown'),
                 'activity': presence.get('activity', 'Unknown')
@@ -96,45 +153,64 @@ class UserService:
             logger.error(f"Erro inesperado ao buscar presença: {e}")
             return {'availability': 'Unknown', 'activity': 'Unknown'}
     
-    def get_all_users_with_presence(self, max_users: int = 50) -> list:
+    def _get_presence_chunk(self, user_ids: list) -> dict:
         """
-        Lista todos os usuários COM status de presença.
+        Busca presença de um lote de usuários (uma única requisição).
+        """
+        try:
+            result = self.graph.post(
+                "/communications/getPresencesByUserId",
+                data={'ids': user_ids}
+            )
+            return self._parse_presences(result)
         
-        NOTA: Pode ser lento se tiver muitos usuários.
+        except Exception as e:
+            logger.error(f"Erro ao buscar presença em lote ({len(user_ids)} usuários): {e}")
+            return {}
+    
+    def get_presences(self, user_ids: list) -> dict:
+        """
+        Obtém presença de vários usuários via endpoint em lote.
+        Os lotes são disparados em paralelo.
+        
+        Args:
+            user_ids: Lista de IDs de usuários
+        
+        Returns:
+            {user_id: {'availability': ..., 'activity': ...}}
+        """
+        chunks = self._chunk_ids(user_ids)
+        
+        if not chunks:
+            return {}
+        
+        logger.debug(f"Buscando presença de {len(user_ids)} usuários em {len(chunks)} lote(s)...")
+        
+        presences = {}
+        with ThreadPoolExecutor(max_workers=min(PRESENCE_MAX_WORKERS, len(chunks))) as executor:
+            for chunk_result in executor.map(self._get_presence_chunk, chunks):
+                presences.update(chunk_result)
+        
+        return presences
+    
+    def get_all_users_with_presence(self, max_users: int = None) -> list:
+        """
+        Lista todos os usuários COM status de presença.
+        Presenças são buscadas em lote (getPresencesByUserId).
         
         Args:
-            max_users: Número máximo de usuários a buscar
+            max_users: Número máximo de usuários a buscar (None = todos)
         
         Returns:
             Lista de dicts com user info + presence
         """
-        users = self.get_all_users()[:max_users]
+        users = self.get_all_users()
+        if max_users:
+            users = users[:max_users]
         
-        result = []
-        for user in users:
-            user_id = user.get('id')
-            display_name = user.get('displayName', 'Sem nome')
-            email = user.get('mail') or user.get('userPrincipalName', 'Sem email')
-            
-            # Busca presença
-            presence = self.get_user_presence(user_id)
-            availability = presence['availability']
-            
-            # Mapeia para formato amigável
-            presence_info = self.PRESENCE_MAP.get(
-                availability,
-                {'emoji': '❓', 'description': availability}
-            )
-            
-            result.append({
-                'name': display_name,
-                'email': email,
-                'status': availability,
-                'emoji': presence_info['emoji'],
-                'status_description': presence_info['description']
-            })
+        presences = self.get_presences([user.get('id') for user in users if user.get('id')])
         
-        return result
+        return self._merge_presences(users, presences)
     
     def format_users_table(self, users: list) -> str:
         """
@@ -160,3 +236,64 @@ class UserService:
         lines.append("=" * 80)
         
         return "\n".join(lines)
+
+
+class AsyncUserService(_UserServiceBase):
+    """
+    Variante assíncrona do UserService.
+    Os lotes de presença são disparados concorrentemente no event loop.
+    """
+    
+    def __init__(self, graph: AsyncGraphClient):
+        self.graph = graph
+        logger.info("AsyncUserService inicializado")
+    
+    async def get_all_users(self) -> list:
+        """
+        Lista todos os usuários da organização.
+        """
+        try:
+            users = [user async for user in self.graph.iter_items(self._users_url(), page_size=None, timeout=15)]
+            logger.info(f"Encontrados {len(users)} usuários")
+            return users
+        
+        except Exception as e:
+            logger.error(f"Erro ao buscar usuários: {e}")
+            return []
+    
+    async def _get_presence_chunk(self, user_ids: list) -> dict:
+        try:
+            result = await self.graph.post(
+                "/communications/getPresencesByUserId",
+                data={'ids': user_ids}
+            )
+            return self._parse_presences(result)
+        
+        except Exception as e:
+            logger.error(f"Erro ao buscar presença em lote ({len(user_ids)} usuários): {e}")
+            return {}
+    
+    async def get_presences(self, user_ids: list) -> dict:
+        """
+        Obtém presença de vários usuários (lotes em paralelo).
+        """
+        presences = {}
+        chunk_results = await asyncio.gather(
+            *(self._get_presence_chunk(chunk) for chunk in self._chunk_ids(user_ids))
+        )
+        for chunk_result in chunk_results:
+            presences.update(chunk_result)
+        
+        return presences
+    
+    async def get_all_users_with_presence(self, max_users: int = None) -> list:
+        """
+        Lista todos os usuários COM status de presença.
+        """
+        users = await self.get_all_users()
+        if max_users:
+            users = users[:max_users]
+        
+        presences = await self.get_presences([user.get('id') for user in users if user.get('id')])
+        
+        return self._merge_presences(users, presences)
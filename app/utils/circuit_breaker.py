@@ -0,0 +1,113 @@
+import threading
+import time
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class CircuitBreaker:
+    """
+    Disjuntor para um serviço externo (ex: Ollama).
+    
+    - FECHADO: chamadas passam normalmente; falhas consecutivas são contadas.
+    - ABERTO: após 'failure_threshold' falhas seguidas, as chamadas são
+      recusadas na hora (sem esperar timeout) por 'reset_timeout' segundos.
+    - MEIO-ABERTO: passado esse tempo, uma única chamada de teste é liberada;
+      sucesso fecha o disjuntor, falha abre de novo.
+    """
+    
+    CLOSED = 'FECHADO'
+    OPEN = 'ABERTO'
+    HALF_OPEN = 'MEIO-ABERTO'
+    
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        
+        self.times_opened = 0
+        self.rejected = 0
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+    
+    def is_open(self) -> bool:
+        """
+        True enquanto as chamadas seriam recusadas. Ao contrário de allow(),
+        não consome o teste do MEIO-ABERTO.
+        """
+        with self._lock:
+            return self._state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+    
+    def allow(self) -> bool:
+        """
+        Verifica se uma chamada pode ser feita agora.
+        
+        Returns:
+            False se o disjuntor estiver aberto (a chamada deve usar o fallback)
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probing = False
+                logger.info(f"🟡 Disjuntor {self.name}: MEIO-ABERTO, testando o serviço...")
+            
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            
+            self.rejected += 1
+            return False
+    
+    def record_success(self):
+        """Registra chamada bem-sucedida (fecha o disjuntor se estava testando)."""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"🟢 Disjuntor {self.name}: FECHADO, serviço respondendo de novo")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+    
+    def record_failure(self):
+        """Registra falha; abre o disjuntor no limite ou se o teste falhar."""
+        with self._lock:
+            self._failures += 1
+            
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(
+                        f"🔴 Disjuntor {self.name}: ABERTO após {self._failures} falha(s). "
+                        f"Usando fallback por {self.reset_timeout}s"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+    
+    def release(self):
+        """
+        Encerra uma chamada sem resultado (ex: cancelada pelo usuário):
+        libera o teste do MEIO-ABERTO sem contar sucesso nem falha.
+        """
+        with self._lock:
+            self._probing = False
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
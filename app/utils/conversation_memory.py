@@ -0,0 +1,125 @@
+import threading
+from app.config.settings import CHAT_MEMORY_TOKEN_BUDGET, CHAT_SUMMARY_TOKEN_BUDGET
+from app.utils.retrieval import estimate_tokens
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class ConversationMemory:
+    """
+    Memória do chat com orçamento de tokens.
+    
+    - As mensagens recentes ficam literais até somarem 'token_budget' tokens.
+    - As que saem da janela viram um resumo corrido, gerado em segundo plano
+      por 'summarize(resumo_atual, mensagens)' sem atrasar a resposta.
+    - Enquanto o resumo não fica pronto, as mensagens aguardam fora do prompt;
+      se o modelo estiver fora do ar, as mais antigas são descartadas para a
+      memória não crescer sem limite.
+    
+    Assim o prompt tem tamanho constante em sessões longas.
+    """
+    
+    MIN_RECENT = 2  # sempre mantém a última troca (pergunta + resposta)
+    
+    def __init__(self, summarize, token_budget: int = CHAT_MEMORY_TOKEN_BUDGET,
+                 summary_budget: int = CHAT_SUMMARY_TOKEN_BUDGET):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        
+        self._lock = threading.Lock()
+        self._recent = []
+        self._pending = []  # fora da janela, aguardando o resumo
+        self._generation = 0  # muda a cada clear(), descarta resumos atrasados
+        self._worker = None
+        self.summary = ""
+        
+        self.summaries = 0
+        self.failures = 0
+        self.dropped = 0
+    
+    @staticmethod
+    def _tokens(messages: list) -> int:
+        return sum(estimate_tokens(message['content']) for message in messages)
+    
+    def add(self, role: str, content: str):
+        """Adiciona uma mensagem e, se a janela estourar, agenda o resumo."""
+        with self._lock:
+            self._recent.append({'role': role, 'content': content})
+            
+            while len(self._recent) > self.MIN_RECENT and self._tokens(self._recent) > self.token_budget:
+                self._pending.append(self._recent.pop(0))
+            
+            while len(self._pending) > 1 and self._tokens(self._pending) > self.token_budget * 2:
+                self._pending.pop(0)
+                self.dropped += 1
+            
+            if not self._pending or (self._worker and self._worker.is_alive()):
+                return
+            
+            self._worker = threading.Thread(target=self._summarize_pending, name="chat-memory", daemon=True)
+            self._worker.start()
+    
+    def _summarize_pending(self):
+        """Incorpora as mensagens pendentes ao resumo (roda em thread própria)."""
+        while True:
+            with self._lock:
+                batch = list(self._pending)
+                summary = self.summary
+                generation = self._generation
+            
+            if not batch:
+                return
+            
+            try:
+                result = self.summarize(summary, batch)
+            except Exception as e:
+                logger.error(f"Erro ao resumir conversa: {e}")
+                result = None
+            
+            with self._lock:
+                if generation != self._generation:
+                    return
+                
+                if not result:
+                    # Tenta de novo na próxima mensagem
+                    self.failures += 1
+                    return
+                
+                done = {id(message) for message in batch}
+                self._pending = [message for message in self._pending if id(message) not in done]
+                self.summary = result[:self.summary_budget * 4]
+                self.summaries += 1
+            
+            logger.debug(f"Resumo da conversa atualizado ({len(batch)} mensagem(ns) incorporada(s))")
+    
+    def messages(self) -> list:
+        """Mensagens recentes, literais, em ordem."""
+        with self._lock:
+            return list(self._recent)
+    
+    def clear(self):
+        with self._lock:
+            self._recent = []
+            self._pending = []
+            self.summary = ""
+            self._generation += 1
+    
+    def wait(self, timeout: float = None):
+        """Aguarda o resumo em andamento (útil ao encerrar)."""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'recent': len(self._recent),
+                'recent_tokens': self._tokens(self._recent),
+                'pending': len(self._pending),
+                'summary_tokens': estimate_tokens(self.summary) if self.summary else 0,
+                'summaries': self.summaries,
+                'failures': self.failures,
+                'dropped': self.dropped
+            }
@@ -0,0 +1,284 @@
+import os
+import tempfile
+import threading
+from pathlib import Path
+import numpy as np
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class EmbeddingIndex:
+    """
+    Índice de embeddings de emails já classificados, em memória (NumPy)
+    e persistido em .npz.
+    
+    Classifica um email novo por k-NN de cosseno: se os k vizinhos mais
+    próximos forem parecidos o bastante e concordarem entre si, o rótulo
+    da maioria é usado sem chamar o LLM.
+    """
+    
+    URGENCY_LEVELS = ['ALTA', 'MÉDIA', 'BAIXA']
+    MIN_CAPACITY = 64
+    
+    def __init__(self, path: str, k: int = 5, min_agreement: float = 0.8,
+                 min_similarity: float = 0.85, max_entries: int = 5000, save_every: int = 20):
+        self.path = path
+        self.k = k
+        self.min_agreement = min_agreement
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        self.save_every = save_every
+        
+        self._lock = threading.Lock()
+        self._reset()
+        self._dirty = 0
+        
+        self.hits = 0
+        self.misses = 0
+        
+        self._load()
+        logger.info(f"EmbeddingIndex inicializado ({len(self)} vetores)")
+    
+    def __len__(self):
+        return self._size
+    
+    def _reset(self):
+        """
+        Esvazia o índice. As matrizes têm capacidade pré-alocada (dobra
+        quando enche, até max_entries); só as _size primeiras linhas valem.
+        Cheio, o índice vira um buffer circular: a linha _oldest é a mais
+        antiga e é a próxima a ser substituída.
+        """
+        self._vectors = None  # matriz (capacidade, dim) com linhas normalizadas
+        self._labels = np.empty(0, dtype='<U8')
+        self._sources = np.empty(0, dtype='<U8')
+        self._keys = []  # chave de cada linha
+        self._rows = {}  # chave -> linha
+        self._size = 0
+        self._oldest = 0
+    
+    def _load(self):
+        """Carrega o índice do disco se existir."""
+        if not Path(self.path).exists():
+            return
+        
+        try:
+            with np.load(self.path) as data:
+                # Gravado do mais antigo para o mais novo
+                vectors = data['vectors'].astype(np.float32)[-self.max_entries:]
+                self._labels = data['labels'][-self.max_entries:].astype('<U8')
+                self._sources = data['sources'][-self.max_entries:].astype('<U8')
+                self._keys = [str(key) for key in data['keys'][-self.max_entries:]]
+            
+            self._vectors = vectors
+            self._size = len(self._keys)
+            self._rows = {key: row for row, key in enumerate(self._keys)}
+        except Exception as e:
+            logger.warning(f"Erro ao carregar índice de embeddings: {e}")
+            self._reset()
+    
+    def _ordered(self, array):
+        """Linhas válidas do mais antigo para o mais novo."""
+        return np.roll(array[:self._size], -self._oldest, axis=0)
+    
+    def save(self):
+        """Salva o índice no disco (escrita atômica)."""
+        with self._lock:
+            if self._vectors is None or not self._dirty:
+                return
+            
+            file_path = Path(self.path)
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(file_path.parent), prefix=f".{file_path.name}.", suffix=".tmp")
+            
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(
+                        f,
+                        vectors=self._ordered(self._vectors),
+                        labels=self._ordered(self._labels),
+                        sources=self._ordered(self._sources),
+                        keys=self._ordered(np.array(self._keys))
+                    )
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, file_path)
+                self._dirty = 0
+            except Exception as e:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                logger.error(f"Erro ao salvar índice de embeddings: {e}")
+    
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def _ensure_capacity(self, dim: int):
+        """Garante espaço para mais uma linha (dobra a capacidade)."""
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if self._size < capacity:
+            return
+        
+        capacity = min(max(capacity * 2, self.MIN_CAPACITY), self.max_entries)
+        
+        vectors = np.empty((capacity, dim), dtype=np.float32)
+        labels = np.empty(capacity, dtype='<U8')
+        sources = np.empty(capacity, dtype='<U8')
+        
+        if self._size:
+            vectors[:self._size] = self._vectors[:self._size]
+            labels[:self._size] = self._labels[:self._size]
+            sources[:self._size] = self._sources[:self._size]
+        
+        self._vectors, self._labels, self._sources = vectors, labels, sources
+    
+    def add(self, key: str, vector, label: str, source: str = 'llm'):
+        """
+        Adiciona (ou substitui) o vetor de um email com seu rótulo.
+        Cheio (max_entries), substitui o mais antigo.
+        
+        Args:
+            key: Identificador do email (id da mensagem no Graph)
+            vector: Embedding do email
+            label: Urgência atribuída
+            source: Origem do rótulo ('llm' ou 'user')
+        """
+        if label not in self.URGENCY_LEVELS:
+            return
+        
+        vector = self._normalize(vector)
+        
+        with self._lock:
+            if self._vectors is not None and vector.shape[0] != self._vectors.shape[1]:
+                logger.warning("Dimensão do embedding mudou (outro modelo?). Recriando índice.")
+                self._reset()
+            
+            row = self._rows.get(key)
+            
+            if row is None and self._size < self.max_entries:
+                self._ensure_capacity(vector.shape[0])
+                row = self._size
+                self._size += 1
+                self._keys.append(key)
+            elif row is None:
+                # Cheio: descarta o mais antigo
+                row = self._oldest
+                del self._rows[self._keys[row]]
+                self._keys[row] = key
+                self._oldest = (row + 1) % self._size
+            
+            self._rows[key] = row
+            self._vectors[row] = vector
+            self._labels[row] = label
+            self._sources[row] = source
+            
+            self._dirty += 1
+            should_save = self._dirty >= self.save_every
+        
+        if should_save:
+            self.save()
+    
+    def _vote(self, similarities: np.ndarray, labels: np.ndarray):
+        """
+        Votação entre os k mais parecidos.
+        
+        Returns:
+            (rótulo, concordância) ou (None, 0.0) se os vizinhos não forem parecidos o bastante
+        """
+        k = min(self.k, similarities.shape[0])
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[similarities[top] >= self.min_similarity]
+        
+        if top.shape[0] < k:
+            return None, 0.0
+        
+        values, counts = np.unique(labels[top], return_counts=True)
+        best = counts.argmax()
+        return str(values[best]), counts[best] / k
+    
+    def predict(self, vector) -> str:
+        """
+        Classifica por k-NN de cosseno.
+        
+        Returns:
+            Urgência se os vizinhos concordarem o suficiente; None caso contrário
+        """
+        with self._lock:
+            if self._size < self.k:
+                self.misses += 1
+                return None
+            
+            vector = self._normalize(vector)
+            if vector.shape[0] != self._vectors.shape[1]:
+                self.misses += 1
+                return None
+            
+            similarities = self._vectors[:self._size] @ vector
+            label, agreement = self._vote(similarities, self._labels[:self._size])
+            
+            if label is None or agreement < self.min_agreement:
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            return label
+    
+    def evaluate(self) -> dict:
+        """
+        Avaliação offline leave-one-out: classifica cada vetor do índice
+        pelos demais e compara com o rótulo guardado (do LLM ou do usuário).
+        
+        Returns:
+            {'total', 'covered', 'coverage', 'agreement', 'confusion': {(rótulo, previsto): n}}
+        """
+        with self._lock:
+            if self._size <= self.k:
+                return {'total': self._size, 'covered': 0, 'coverage': 0.0,
+                        'agreement': 0.0, 'confusion': {}}
+            
+            # Cópia: add() altera as linhas no lugar
+            vectors = self._vectors[:self._size].copy()
+            labels = self._labels[:self._size].copy()
+        
+        covered = 0
+        agreed = 0
+        confusion = {}
+        
+        # Em blocos para não montar a matriz n x n inteira
+        for start in range(0, vectors.shape[0], 500):
+            block = vectors[start:start + 500] @ vectors.T
+            
+            for row, similarities in enumerate(block):
+                i = start + row
+                similarities[i] = -np.inf  # o próprio email não vota
+                
+                label, agreement = self._vote(similarities, labels)
+                if label is None or agreement < self.min_agreement:
+                    continue
+                
+                covered += 1
+                agreed += int(label == labels[i])
+                pair = (str(labels[i]), label)
+                confusion[pair] = confusion.get(pair, 0) + 1
+        
+        total = vectors.shape[0]
+        return {
+            'total': total,
+            'covered': covered,
+            'coverage': round(covered / total, 3),
+            'agreement': round(agreed / covered, 3) if covered else 0.0,
+            'confusion': confusion
+        }
+    
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
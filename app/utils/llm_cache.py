@@ -0,0 +1,104 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from app.utils.storage import load_json, atomic_write_json
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class LLMCache:
+    """
+    Cache persistente de respostas do LLM com despejo LRU e TTL.
+    
+    A chave é um hash do nome do modelo + prompt normalizado, então
+    trocar de modelo invalida automaticamente as entradas antigas.
+    """
+    
+    def __init__(self, path: str, max_entries: int = 2000, ttl_seconds: int = 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._load()
+        logger.info(f"LLMCache inicializado ({len(self._entries)} entradas)")
+    
+    @staticmethod
+    def make_key(model: str, prompt: str) -> str:
+        """Hash do modelo + prompt com espaços normalizados."""
+        normalized = " ".join(prompt.split())
+        return hashlib.sha256(f"{model}\n{normalized}".encode('utf-8')).hexdigest()
+    
+    def _load(self):
+        """Carrega o cache do disco, descartando entradas expiradas."""
+        try:
+            data = load_json(self.path, default={})
+            now = time.time()
+            for key, entry in data.get('entries', []):
+                if now - entry['created_at'] < self.ttl_seconds:
+                    self._entries[key] = entry
+        except Exception as e:
+            logger.warning(f"Erro ao carregar cache do LLM: {e}")
+            self._entries = OrderedDict()
+    
+    def _save(self):
+        """Salva o cache no disco, preservando a ordem LRU."""
+        try:
+            atomic_write_json(self.path, {'entries': list(self._entries.items())})
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache do LLM: {e}")
+    
+    def get(self, model: str, prompt: str):
+        """
+        Busca resposta em cache.
+        
+        Returns:
+            Resposta armazenada ou None (ausente/expirada)
+        """
+        key = self.make_key(model, prompt)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            
+            if entry is None or time.time() - entry['created_at'] >= self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['value']
+    
+    def set(self, model: str, prompt: str, value: str):
+        """Armazena resposta, despejando as menos usadas se passar do limite."""
+        key = self.make_key(model, prompt)
+        
+        with self._lock:
+            self._entries[key] = {'value': value, 'created_at': time.time()}
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            
+            self._save()
+    
+    def stats(self) -> dict:
+        """Contadores de uso do cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+import queue
+import time
+from app.config.settings import (
+    VIP_SENDERS, PRIORITY_KEYWORDS, BULK_SENDER_PATTERNS,
+    PRIORITY_DEADLINE_ALTA, PRIORITY_DEADLINE_MEDIA, PRIORITY_DEADLINE_BAIXA
+)
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+# Classes de prioridade (menor = mais urgente)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_HIGH: 'ALTA',
+    PRIORITY_NORMAL: 'MÉDIA',
+    PRIORITY_LOW: 'BAIXA'
+}
+
+# Prazo (segundos na fila) de cada classe antes de passar à frente das demais
+PRIORITY_DEADLINES = {
+    PRIORITY_HIGH: PRIORITY_DEADLINE_ALTA,
+    PRIORITY_NORMAL: PRIORITY_DEADLINE_MEDIA,
+    PRIORITY_LOW: PRIORITY_DEADLINE_BAIXA
+}
+
+
+def score_email(email: dict) -> int:
+    """
+    Prioridade de um email só com metadados do Graph (sem LLM):
+    importância, remetente VIP, palavras-chave no assunto e remetentes
+    de envio em massa.
+    
+    Returns:
+        PRIORITY_HIGH, PRIORITY_NORMAL ou PRIORITY_LOW
+    """
+    sender = (((email.get('from') or {}).get('emailAddress') or {}).get('address') or '').lower()
+    subject = email.get('subject', '').lower()
+    importance = email.get('importance', 'normal')
+    
+    if importance == 'high' or sender in VIP_SENDERS:
+        return PRIORITY_HIGH
+    
+    if any(keyword in subject for keyword in PRIORITY_KEYWORDS):
+        return PRIORITY_HIGH
+    
+    if importance == 'low' or any(pattern in sender for pattern in BULK_SENDER_PATTERNS):
+        return PRIORITY_LOW
+    
+    return PRIORITY_NORMAL
+
+
+class _DeadlineOrder:
+    """
+    Ordena a fila por prazo absoluto (earliest deadline first): cada email
+    entra com prazo = agora + prazo da sua classe. Urgentes saem primeiro,
+    mas um email de massa que estourou o prazo passa à frente de urgentes
+    recém-chegados, então nenhuma classe fica esperando para sempre.
+    
+    Mantém a API da fila base (put/get/get_nowait, Full/Empty); os itens
+    entram e saem como emails.
+    """
+    
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self._seq = itertools.count()
+        self.deadline_misses = {name: 0 for name in PRIORITY_NAMES.values()}
+    
+    def _put(self, email):
+        priority = score_email(email)
+        deadline = time.monotonic() + PRIORITY_DEADLINES[priority]
+        super()._put((deadline, next(self._seq), priority, email))
+    
+    def _get(self):
+        deadline, _, priority, email = super()._get()
+        
+        overdue = time.monotonic() - deadline
+        if overdue > 0:
+            name = PRIORITY_NAMES[priority]
+            self.deadline_misses[name] += 1
+            logger.debug(f"Prazo da fila estourado ({name}, +{overdue:.1f}s): {email.get('subject', '')}")
+        
+        return email
+
+
+class PriorityScheduler(_DeadlineOrder, queue.PriorityQueue):
+    """Fila de classificação por prioridade para o pipeline com threads."""
+
+
+class AsyncPriorityScheduler(_DeadlineOrder, asyncio.PriorityQueue):
+    """Fila de classificação por prioridade para o agente asyncio."""
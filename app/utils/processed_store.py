@@ -0,0 +1,95 @@
+import threading
+from datetime import datetime
+from app.utils.storage import load_json, atomic_write_json
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class ProcessedStore:
+    """
+    Registro persistente dos emails já processados pelo agente.
+    
+    A chave é o id da mensagem + lastModifiedDateTime, então um email
+    só volta a ser classificado se for modificado no servidor.
+    O arquivo sobrevive a reinícios do agente.
+    
+    Classificações provisórias (heurística com o Ollama fora do ar) ficam
+    marcadas para que o agente as refaça quando o modelo voltar.
+    """
+    
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._load()
+        logger.info(f"ProcessedStore inicializado ({len(self._entries)} emails já processados)")
+    
+    @staticmethod
+    def make_key(email: dict) -> str:
+        """Monta a chave de um email: id + lastModifiedDateTime."""
+        return f"{email.get('id', '')}|{email.get('lastModifiedDateTime', '')}"
+    
+    def _load(self):
+        """Carrega o registro do disco se existir."""
+        try:
+            data = load_json(self.path, default={})
+            self._entries = data.get('entries', {})
+        except Exception as e:
+            logger.warning(f"Erro ao carregar registro de emails processados: {e}")
+            self._entries = {}
+    
+    def _save(self):
+        """Salva o registro no disco (escrita atômica)."""
+        try:
+            atomic_write_json(self.path, {'entries': self._entries})
+        except Exception as e:
+            logger.error(f"Erro ao salvar registro de emails processados: {e}")
+    
+    def is_processed(self, email: dict, include_provisional: bool = True) -> bool:
+        """
+        Verifica se o email (nesta versão) já foi processado.
+        
+        Args:
+            email: Dicionário com dados do email
+            include_provisional: Se False, classificações provisórias não contam
+        """
+        with self._lock:
+            entry = self._entries.get(self.make_key(email))
+        
+        if entry is None:
+            return False
+        return include_provisional or not entry.get('provisional', False)
+    
+    def mark_processed(self, email: dict, urgency: str = None, provisional: bool = False):
+        """
+        Registra o email como processado e persiste no disco.
+        
+        Args:
+            email: Dicionário com dados do email
+            urgency: Classificação obtida (opcional, só informativo)
+            provisional: True se a classificação não veio do modelo
+        """
+        with self._lock:
+            key = self.make_key(email)
+            # Reclassificação vai para o fim (mais recente na ordem de despejo)
+            self._entries.pop(key, None)
+            self._entries[key] = {
+                'processed_at': datetime.now().isoformat(),
+                'urgency': urgency
+            }
+            if provisional:
+                self._entries[key]['provisional'] = True
+            
+            # Descarta as entradas mais antigas (dict mantém ordem de inserção)
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                for key in list(self._entries)[:overflow]:
+                    del self._entries[key]
+            
+            self._save()
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
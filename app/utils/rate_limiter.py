@@ -0,0 +1,224 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from app.config.settings import GRAPH_RATE_LIMITS, GRAPH_RETRY_DELAY
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class TokenBucket:
+    """
+    Balde de fichas de um endpoint: 'rate' requisições por segundo com
+    rajada de até 'capacity'. A taxa é adaptativa: cai pela metade a cada
+    throttling do Graph e volta aos poucos a cada sucesso.
+    """
+    
+    MIN_RATE_FRACTION = 0.1  # nunca desce abaixo de 10% da taxa configurada
+    RECOVERY_STEPS = 20  # sucessos para recuperar a taxa cheia a partir de zero
+    
+    def __init__(self, rate: float, capacity: float = None):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self.paused_until = 0.0
+        
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+    
+    def reserve(self, cost: int, now: float) -> float:
+        """
+        Retira 'cost' fichas (o saldo pode ficar negativo: quem chega depois
+        espera na fila) e devolve quantos segundos esperar antes de enviar.
+        """
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= cost
+        self.requests += cost
+        
+        wait = max(-self._tokens / self.rate if self._tokens < 0 else 0.0, self.paused_until - now)
+        self.waited += wait
+        return wait
+    
+    def pause(self, seconds: float, now: float):
+        """Pausa o endpoint (Retry-After) e reduz a taxa pela metade."""
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.rate = max(self.rate / 2, self.base_rate * self.MIN_RATE_FRACTION)
+        self._tokens = min(self._tokens, 0.0)
+        self.throttled += 1
+    
+    def recover(self):
+        self.rate = min(self.base_rate, self.rate + self.base_rate / self.RECOVERY_STEPS)
+
+
+class RateLimiter:
+    """
+    Limitador de requisições ao Graph compartilhado pelo processo inteiro
+    (todos os serviços, threads e o event loop do modo async).
+    
+    Cada endpoint tem seu orçamento (GRAPH_RATE_LIMITS, req/s). Num 429/503
+    o endpoint inteiro pausa pelo Retry-After (com jitter), não só a
+    requisição que levou o throttling, evitando rajadas de retries.
+    """
+    
+    MAX_BACKOFF_SECONDS = 60
+    
+    # (endpoint, trechos do caminho da URL que o identificam), em ordem
+    ENDPOINTS = [
+        ('presence', ('/presence', '/communications/getpresencesbyuserid')),
+        ('outlook', ('/messages', '/mailfolders', '/calendar', '/events', '/calendarview')),
+        ('users', ('/users',)),
+    ]
+    
+    def __init__(self, limits: dict = None, retry_delay: float = GRAPH_RETRY_DELAY):
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._buckets = {
+            endpoint: TokenBucket(rate)
+            for endpoint, rate in (limits if limits is not None else self._parse_limits(GRAPH_RATE_LIMITS)).items()
+        }
+        self._buckets.setdefault('default', TokenBucket(10))
+    
+    @staticmethod
+    def _parse_limits(entries: list) -> dict:
+        """['outlook:15', 'presence:5'] -> {'outlook': 15.0, 'presence': 5.0}"""
+        limits = {}
+        for entry in entries:
+            try:
+                endpoint, rate = entry.split(':')
+                limits[endpoint.strip()] = float(rate)
+            except ValueError:
+                logger.warning(f"Limite de taxa inválido em GRAPH_RATE_LIMITS: '{entry}'")
+        return limits
+    
+    def endpoint_of(self, url: str) -> str:
+        """Classifica a URL (absoluta ou relativa) num endpoint com orçamento próprio."""
+        path = urlparse(url).path.lower()
+        
+        for endpoint, markers in self.ENDPOINTS:
+            if endpoint in self._buckets and any(marker in path for marker in markers):
+                return endpoint
+        
+        return 'default'
+    
+    def reserve(self, costs: dict) -> float:
+        """
+        Reserva fichas em cada endpoint ({endpoint: n}) sem bloquear.
+        
+        Returns:
+            Segundos a esperar antes de enviar a requisição
+        """
+        now = time.monotonic()
+        
+        with self._lock:
+            return max(
+                self._buckets.get(endpoint, self._buckets['default']).reserve(cost, now)
+                for endpoint, cost in costs.items()
+            )
+    
+    def pause_remaining(self, costs: dict) -> float:
+        """Tempo que ainda falta de pausa (Retry-After recebido durante a espera)."""
+        now = time.monotonic()
+        
+        with self._lock:
+            return max(
+                self._buckets.get(endpoint, self._buckets['default']).paused_until - now
+                for endpoint in costs
+            )
+    
+    def acquire(self, costs: dict):
+        """Bloqueia até a requisição caber no orçamento dos endpoints."""
+        wait = self.reserve(costs)
+        
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.pause_remaining(costs)
+    
+    async def acquire_async(self, costs: dict):
+        """Como acquire(), sem bloquear o event loop."""
+        wait = self.reserve(costs)
+        
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.pause_remaining(costs)
+    
+    @staticmethod
+    def parse_retry_after(value) -> float:
+        """
+        Retry-After em segundos ou data HTTP.
+        
+        Returns:
+            Segundos a esperar, ou None se ausente/inválido
+        """
+        if value is None:
+            return None
+        
+        try:
+            return max(float(value), 0.0)
+        except (TypeError, ValueError):
+            pass
+        
+        try:
+            return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
+    
+    def throttled(self, costs: dict, retry_after=None, attempt: int = 0) -> float:
+        """
+        Registra um 429/503: pausa os endpoints e reduz a taxa deles.
+        
+        Args:
+            costs: Endpoints da requisição limitada ({endpoint: n})
+            retry_after: Valor do header Retry-After (se veio)
+            attempt: Tentativa atual (back-off exponencial sem Retry-After)
+        
+        Returns:
+            Segundos de pausa aplicados (com jitter)
+        """
+        seconds = self.parse_retry_after(retry_after)
+        
+        if seconds is not None:
+            delay = seconds + random.uniform(0, max(seconds * 0.1, 0.5))
+        else:
+            delay = random.uniform(self.retry_delay, self.retry_delay * 2 ** (attempt + 1))
+        
+        delay = min(delay, self.MAX_BACKOFF_SECONDS)
+        now = time.monotonic()
+        
+        with self._lock:
+            for endpoint in costs:
+                self._buckets.get(endpoint, self._buckets['default']).pause(delay, now)
+        
+        return delay
+    
+    def record_success(self, costs: dict):
+        with self._lock:
+            for endpoint in costs:
+                self._buckets.get(endpoint, self._buckets['default']).recover()
+    
+    def stats(self) -> dict:
+        """
+        Returns:
+            {'outlook': {'rate': 15.0, 'requests': 120, 'throttled': 0, 'waited_s': 1.2}, ...}
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    'rate': round(bucket.rate, 2),
+                    'requests': bucket.requests,
+                    'throttled': bucket.throttled,
+                    'waited_s': round(bucket.waited, 1)
+                }
+                for endpoint, bucket in self._buckets.items()
+            }
+
+
+# Instância única do processo: todos os clientes do Graph dividem o orçamento
+graph_rate_limiter = RateLimiter()
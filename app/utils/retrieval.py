@@ -0,0 +1,138 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+import numpy as np
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'um', 'uma', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'no', 'na',
+    'nos', 'nas', 'por', 'para', 'pra', 'com', 'sem', 'que', 'se', 'me', 'meu', 'minha', 'eu',
+    'voce', 'ele', 'ela', 'isso', 'esse', 'essa', 'este', 'esta', 'ao', 'aos', 'ou', 'mais',
+    'sobre', 'qual', 'quais', 'quem', 'como', 'quando', 'onde', 'algum', 'alguma', 'tem',
+    'tenho', 'ha', 'foi', 'sao', 'ser', 'email', 'emails', 're', 'fw', 'enc', 'the', 'and',
+    'to', 'of', 'for', 'in', 'on', 'is'
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list:
+    """Minúsculas, sem acentos, sem stopwords e sem tokens de 1 letra."""
+    return [t for t in _TOKEN_RE.findall(normalize_text(text)) if len(t) > 1 and t not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa grosseira de tokens do modelo (~4 caracteres por token)."""
+    return len(text) // 4 + 1
+
+
+class BM25Index:
+    """
+    Índice BM25 em memória sobre emails (assunto com peso dobrado,
+    remetente e prévia do corpo).
+    """
+    
+    K1 = 1.5
+    B = 0.75
+    SUBJECT_WEIGHT = 2
+    
+    def __init__(self, emails: list):
+        self.emails = emails
+        self._term_freqs = []
+        self._lengths = []
+        document_freq = Counter()
+        
+        for email in emails:
+            terms = self._document_terms(email)
+            freqs = Counter(terms)
+            self._term_freqs.append(freqs)
+            self._lengths.append(len(terms))
+            document_freq.update(freqs.keys())
+        
+        count = len(emails)
+        self._avg_length = (sum(self._lengths) / count) if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for term, df in document_freq.items()
+        }
+        
+        logger.debug(f"Índice BM25 montado: {count} emails, {len(self._idf)} termos")
+    
+    def __len__(self):
+        return len(self.emails)
+    
+    @classmethod
+    def _document_terms(cls, email: dict) -> list:
+        subject = email.get('subject', '') or ''
+        sender = (email.get('from') or {}).get('emailAddress') or {}
+        sender_text = f"{sender.get('name', '')} {sender.get('address', '')}"
+        return (
+            tokenize(subject) * cls.SUBJECT_WEIGHT
+            + tokenize(sender_text)
+            + tokenize(email.get('bodyPreview', '') or '')
+        )
+    
+    def search(self, query: str, k: int = 10) -> list:
+        """
+        Emails mais relevantes para a consulta.
+        
+        Returns:
+            [(score, email), ...] em ordem decrescente, só com score > 0
+        """
+        terms = [t for t in set(tokenize(query)) if t in self._idf]
+        if not terms or not self.emails:
+            return []
+        
+        scores = []
+        for idx, freqs in enumerate(self._term_freqs):
+            norm = self.K1 * (1 - self.B + self.B * self._lengths[idx] / (self._avg_length or 1))
+            score = 0.0
+            for term in terms:
+                tf = freqs.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.K1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((score, idx))
+        
+        scores.sort(reverse=True)
+        return [(score, self.emails[idx]) for score, idx in scores[:k]]
+
+
+def rerank_with_embeddings(query_vector, candidates: list, vectors: dict, weight: float = 0.5) -> list:
+    """
+    Reordena candidatos do BM25 combinando o score lexical (normalizado)
+    com a similaridade de cosseno dos embeddings.
+    
+    Args:
+        query_vector: Embedding da pergunta
+        candidates: [(score_bm25, email), ...]
+        vectors: {email_id: embedding}
+        weight: Peso da similaridade semântica (0 = só BM25)
+    """
+    if not candidates:
+        return candidates
+    
+    query = np.asarray(query_vector, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    top_score = candidates[0][0] or 1.0
+    
+    reranked = []
+    for score, email in candidates:
+        vector = vectors.get(email.get('id'))
+        similarity = 0.0
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            similarity = float(vector @ query / (np.linalg.norm(vector) or 1.0))
+        reranked.append(((1 - weight) * score / top_score + weight * similarity, email))
+    
+    reranked.sort(key=lambda item: item[0], reverse=True)
+    return reranked
@@ -0,0 +1,162 @@
+import threading
+from app.config.settings import BULK_SENDER_PATTERNS
+from app.utils.storage import load_json
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+# Regras padrão, na ordem de avaliação (a primeira que casar decide).
+# Campos: sender, subject, importance, header (internetMessageHeaders)
+# Tipos de match: contains, prefix, equals, present
+DEFAULT_RULES = [
+    {
+        'name': 'resposta_calendario',
+        'field': 'subject',
+        'match': 'prefix',
+        'values': [
+            'aceito:', 'recusado:', 'provisório:', 'accepted:', 'declined:', 'tentative:',
+            'resposta automática', 'automatic reply', 'ausência temporária', 'out of office'
+        ],
+        'urgency': 'BAIXA'
+    },
+    {
+        'name': 'remetente_em_massa',
+        'field': 'sender',
+        'match': 'contains',
+        'values': list(BULK_SENDER_PATTERNS),
+        'urgency': 'BAIXA'
+    },
+    {
+        'name': 'lista_de_email',
+        'field': 'header',
+        'match': 'present',
+        'values': ['list-unsubscribe', 'list-id'],
+        'urgency': 'BAIXA'
+    },
+    {
+        'name': 'assunto_urgente',
+        'field': 'subject',
+        'match': 'contains',
+        'values': ['urgente', 'urgent', 'prazo hoje', 'vence hoje', 'asap', 'imediato'],
+        'urgency': 'ALTA'
+    },
+    {
+        'name': 'importancia_alta',
+        'field': 'importance',
+        'match': 'equals',
+        'values': ['high'],
+        'urgency': 'ALTA'
+    },
+    {
+        'name': 'importancia_baixa',
+        'field': 'importance',
+        'match': 'equals',
+        'values': ['low'],
+        'urgency': 'BAIXA'
+    },
+]
+
+
+class RuleClassifier:
+    """
+    Pré-classificação determinística de urgência, antes do LLM.
+    
+    Resolve os casos óbvios (remetentes noreply, listas de email, respostas
+    de calendário, assuntos "URGENTE", importância do Graph) com regras
+    configuráveis; o que não casar com nenhuma regra segue para o modelo.
+    """
+    
+    URGENCY_LEVELS = ['ALTA', 'MÉDIA', 'BAIXA']
+    
+    def __init__(self, rules: list = None, rules_file: str = None):
+        if rules is None and rules_file:
+            rules = self._load_rules(rules_file)
+        
+        self.rules = [self._compile(rule) for rule in (rules or DEFAULT_RULES)]
+        self.rules = [rule for rule in self.rules if rule]
+        
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.matches = {rule['name']: 0 for rule in self.rules}
+        
+        logger.info(f"RuleClassifier inicializado ({len(self.rules)} regras)")
+    
+    @staticmethod
+    def _load_rules(path: str) -> list:
+        """Carrega regras de um arquivo JSON (lista no formato de DEFAULT_RULES)."""
+        try:
+            rules = load_json(path, default=None)
+            if rules is None:
+                logger.warning(f"Arquivo de regras não encontrado: {path}. Usando regras padrão.")
+            return rules
+        except Exception as e:
+            logger.error(f"Erro ao carregar regras de {path}: {e}. Usando regras padrão.")
+            return None
+    
+    def _compile(self, rule: dict) -> dict:
+        """Valida a regra e normaliza os valores para minúsculas."""
+        if rule.get('urgency') not in self.URGENCY_LEVELS:
+            logger.warning(f"Regra ignorada (urgência inválida): {rule.get('name')}")
+            return None
+        
+        return {
+            'name': rule.get('name', rule['field']),
+            'field': rule['field'],
+            'match': rule.get('match', 'contains'),
+            'values': tuple(str(v).lower() for v in rule.get('values', [])),
+            'urgency': rule['urgency']
+        }
+    
+    @staticmethod
+    def _field_value(email: dict, field: str):
+        if field == 'sender':
+            # Graph devolve 'from': null em rascunhos e alguns avisos do sistema
+            address = ((email.get('from') or {}).get('emailAddress') or {}).get('address')
+            return (address or '').lower()
+        if field == 'header':
+            return {h.get('name', '').lower() for h in email.get('internetMessageHeaders') or []}
+        return str(email.get(field) or '').lower()
+    
+    @staticmethod
+    def _matches(rule: dict, value) -> bool:
+        values = rule['values']
+        match = rule['match']
+        
+        if match == 'present':
+            return any(v in value for v in values)
+        if match == 'prefix':
+            return value.startswith(values)
+        if match == 'equals':
+            return value in values
+        return any(v in value for v in values)
+    
+    def classify(self, email: dict) -> str:
+        """
+        Aplica as regras na ordem.
+        
+        Returns:
+            "ALTA", "MÉDIA" ou "BAIXA" se alguma regra decidir; None caso contrário
+        """
+        with self._lock:
+            self.checked += 1
+        
+        for rule in self.rules:
+            if self._matches(rule, self._field_value(email, rule['field'])):
+                with self._lock:
+                    self.matches[rule['name']] += 1
+                logger.debug(f"Regra '{rule['name']}' → {rule['urgency']}: {email.get('subject', '')[:50]}")
+                return rule['urgency']
+        
+        return None
+    
+    def stats(self) -> dict:
+        """Quantos emails passaram pelas regras e quantas chamadas ao LLM foram poupadas."""
+        with self._lock:
+            saved = sum(self.matches.values())
+            return {
+                'checked': self.checked,
+                'llm_calls_saved': saved,
+                'rate': round(saved / self.checked, 3) if self.checked else 0.0,
+                'by_rule': dict(self.matches)
+            }
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+def load_json(path: str, default=None):
+    """
+    Carrega um arquivo JSON do disco.
+    
+    Args:
+        path: Caminho do arquivo
+        default: Valor retornado se o arquivo não existir
+    
+    Returns:
+        Conteúdo do arquivo ou o valor padrão
+    """
+    file_path = Path(path)
+    
+    if not file_path.exists():
+        return default
+    
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def atomic_write_json(path: str, data):
+    """
+    Grava JSON de forma atômica (arquivo temporário + rename).
+    Evita arquivos corrompidos se o processo cair no meio da escrita.
+    """
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False))
+
+
+def atomic_write_text(path: str, text: str):
+    """
+    Grava texto de forma atômica (arquivo temporário + rename).
+    O arquivo final fica só com permissão do dono (0600, do mkstemp).
+    """
+    file_path = Path(path)
+    
+    if file_path.parent and not file_path.parent.exists():
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    fd, tmp_path = tempfile.mkstemp(dir=str(file_path.parent or '.'), prefix=f".{file_path.name}.", suffix=".tmp")
+    
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
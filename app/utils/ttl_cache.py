@@ -0,0 +1,70 @@
+import threading
+import time
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+
+class TTLCache:
+    """
+    Cache em memória com expiração por tempo, para valores caros de montar
+    (ex: contexto da caixa de entrada do chat, resumo do dia).
+    
+    Pode ser invalidado por inteiro quando chegam emails novos.
+    """
+    
+    def __init__(self, ttl_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: str):
+        """Valor em cache, ou None se ausente/expirado."""
+        with self._lock:
+            entry = self._entries.get(key)
+            
+            if entry is None or time.monotonic() - entry[1] >= self.ttl_seconds:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            
+            self.hits += 1
+            return entry[0]
+    
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+    
+    def get_or_set(self, key: str, factory):
+        """
+        Retorna o valor em cache ou monta com factory() e guarda.
+        Exceções de factory não são guardadas.
+        """
+        value = self.get(key)
+        
+        if value is None:
+            value = factory()
+            self.set(key, value)
+        
+        return value
+    
+    def invalidate(self, key: str = None):
+        """Descarta uma chave ou, sem argumento, o cache inteiro."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
@@ -5,7 +5,8 @@ Versão: 2.0 (Com Menu)
 """
 
 from app.config.settings import TENANT_ID, CLIENT_ID, SCOPES
-from app.services.auth_service import AuthService
+from app.services.auth_service import AuthService, TokenProvider
+from app.services.graph_client import GraphClient
 from app.services.email_service import EmailService
 from app.services.user_service import UserService
 from app.services.report_service import ReportService
@@ -29,13 +30,14 @@ def main():
         # Autenticação
         logger.info("🔐 Iniciando autenticação...")
         auth = AuthService(TENANT_ID, CLIENT_ID, SCOPES)
-        token = auth.get_token()
+        token_provider = TokenProvider(auth).start()
         logger.info("✅ Autenticação bem-sucedida")
         
         # Inicialização dos serviços
         logger.info("⚙️  Inicializando serviços...")
-        email_service = EmailService(token)
-        user_service = UserService(token)
+        graph = GraphClient(token_provider)
+        email_service = EmailService(graph)
+        user_service = UserService(graph)
         ai_service = AIService()
         report_service = ReportService(email_service)
         chat_service = ChatService(email_service, ai_service, report_service)
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.gettempdir(), 'email_agent_tests.log'))
+
+import pytest
+from app.services.intent_router import IntentRouter
+
+router = IntentRouter(email_service=None)
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("Quantos emails não lidos eu tenho?", 'unread_count'),
+    ("Quantos emails recebi hoje?", 'today'),
+    ("Há emails com anexos?", 'attachments'),
+    ("Qual foi o último email que recebi?", 'last_email'),
+    ("Quem mais me enviou emails esta semana?", 'top_senders'),
+    ("Preciso responder algum email?", 'unanswered'),
+    ("Tenho algum email importante ou urgente?", 'important'),
+])
+def test_answers_known_lookups(question, intent):
+    assert router.match(question) == intent
+
+
+@pytest.mark.parametrize("question", [
+    # Período que a consulta fixa não respeita
+    "Quantos emails não lidos tenho hoje?",
+    "Quem mais me enviou emails nos últimos 3 meses?",
+    "Quem mais me enviou emails este ano?",
+    "Há emails com anexos de ontem?",
+    "Tenho algum email importante hoje?",
+    "Preciso responder algum email dos últimos 30 dias?",
+    # Estado de leitura em intenção que não filtra por leitura
+    "Qual foi o último email não lido?",
+    "Há emails não lidos com anexos?",
+    # Remetente/assunto ou pedido de análise
+    "Quantos emails do Pedro hoje?",
+    "Resuma o último email",
+    "Há emails com anexos sobre o contrato?",
+])
+def test_sends_filtered_or_open_questions_to_the_model(question):
+    assert router.match(question) is None